@@ -0,0 +1,171 @@
+# src/analyzer_cache.py
+# author: @taryaksama
+
+# Memoization of the analyzeSet* functions, keyed by a fingerprint of the content of the cards they read
+# - the fingerprint hashes only the columns the analyzer depends on (row order included, index ignored),
+#   so a re-filtered or re-loaded DataFrame with the same cards hits the cache
+# - the analyzer version is part of the key: bump it when the analyzer changes its results
+# - results are kept in an in-memory LRU, and optionally pickled in a directory (survives kernel restarts
+#   and autoreload, which creates a new in-memory cache)
+
+import copy
+import hashlib
+import inspect
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+from typing import Optional, Sequence
+
+def content_fingerprint(cards: pd.DataFrame, columns: Sequence[str]) -> str:
+    """
+    Hash of the values of `columns` of `cards` (the missing columns are skipped), in row order.
+    List cells (types, keywords, ...) are hashed through their joined values.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(cards)).encode())
+    for c in columns:
+        if c not in cards:
+            continue
+        values = cards[c]
+        if values.dtype == object:
+            values = values.map(lambda x: '\x1f'.join(map(str, x)) if isinstance(x, (list, tuple, np.ndarray)) else x)
+        h.update(c.encode())
+        h.update(str(values.dtype).encode())
+        h.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+class AnalyzerCache():
+    """
+    LRU cache of the results of the analyzers, with an optional on-disk tier and hit / miss statistics.
+
+    Example:
+    --------
+    ANALYZER_CACHE.set_disk('data/cache')    # optional
+    analyzeSetSpeed(cards)                   # computed
+    analyzeSetSpeed(cards.copy())            # same content: from the cache
+    ANALYZER_CACHE.stats()
+    """
+
+    def __init__(self, maxsize: int = 256, path=None) -> None:
+        self.maxsize = maxsize
+        self.enabled = True
+        self.path = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.set_disk(path)
+
+    def set_disk(self, path) -> None:
+        # Directory of the on-disk tier (None to disable it)
+        self.path = Path(path) if path is not None else None
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def _count(self, name: str, event: str) -> None:
+        counts = self._stats.setdefault(name, {'hits': 0, 'disk_hits': 0, 'misses': 0})
+        counts[event] += 1
+
+    def get(self, key: tuple):
+        """
+        Cached result of `key` (name, version, fingerprint, arguments), or None.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._count(key[0], 'hits')
+                return self._memory[key]
+        if self.path is not None:
+            file = self._file(key)
+            if file.exists():
+                try:
+                    result = pickle.loads(file.read_bytes())
+                except Exception:
+                    file.unlink(missing_ok=True) # unreadable (ie. written by another version of the record classes)
+                else:
+                    with self._lock:
+                        self._count(key[0], 'disk_hits')
+                        self._put(key, result)
+                    return result
+        with self._lock:
+            self._count(key[0], 'misses')
+        return None
+
+    def set(self, key: tuple, result) -> None:
+        with self._lock:
+            self._put(key, result)
+        if self.path is not None:
+            tmp = self._file(key).with_suffix('.tmp')
+            tmp.write_bytes(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+            tmp.replace(self._file(key))
+
+    def _put(self, key: tuple, result) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _file(self, key: tuple) -> Path:
+        name, version = key[:2]
+        digest = hashlib.blake2b(repr(key[2:]).encode(), digest_size=16).hexdigest()
+        return self.path / f'{name}-v{version}-{digest}.pkl'
+
+    def clear(self, disk: bool = False) -> None:
+        """
+        Empties the in-memory tier (and the on-disk one if `disk`) and resets the statistics.
+        """
+        with self._lock:
+            self._memory.clear()
+            self._stats = {}
+        if disk and self.path is not None:
+            for file in self.path.glob('*.pkl'):
+                file.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """
+        Per-analyzer 'hits' (in memory), 'disk_hits', 'misses' and 'hit_rate', plus the in-memory 'size'.
+        """
+        with self._lock:
+            stats = {name: dict(c) for name, c in self._stats.items()}
+            size = len(self._memory)
+        for c in stats.values():
+            calls = c['hits'] + c['disk_hits'] + c['misses']
+            c['hit_rate'] = (c['hits'] + c['disk_hits']) / calls if calls else 0.0
+        return {'size': size, 'analyzers': stats}
+
+ANALYZER_CACHE = AnalyzerCache()
+
+def cached_analyzer(version: str, columns: Sequence[str], cache: Optional[AnalyzerCache] = None):
+    """
+    Decorator memoizing an analyzer `f(cards, ...)` on the content of `columns` of `cards`, its other
+    arguments (defaults applied) and `version`. The `store` argument is not part of the key: a FeatureStore
+    only changes how the features are obtained, not their values.
+
+    A copy of the cached result is returned, so the records can be modified by the caller.
+    """
+    def decorator(f):
+        signature = inspect.signature(f)
+
+        @wraps(f)
+        def wrapper(cards, *args, **kwargs):
+            c = cache if cache is not None else ANALYZER_CACHE
+            if not c.enabled:
+                return f(cards, *args, **kwargs)
+            bound = signature.bind(cards, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = tuple((k, repr(v)) for k, v in bound.arguments.items() if k not in ('cards', 'store'))
+            key = (f.__name__, str(version), content_fingerprint(cards, columns), arguments)
+            result = c.get(key)
+            if result is None:
+                result = f(cards, *args, **kwargs)
+                c.set(key, result)
+            return copy.deepcopy(result)
+
+        wrapper.version = version
+        wrapper.columns = tuple(columns)
+        wrapper.uncached = f
+        return wrapper
+    return decorator
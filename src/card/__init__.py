@@ -1,6 +1,9 @@
 # src/card/__init__.py
 # author: @taryaksama
 
+from .parser import *
+from .mana import *
+from .rules import *
 from .mixin import *
 from .card import *
 from .effects import *
@@ -9,16 +9,206 @@ Defines the main properties of what constitutes a body in a Magic: the Gathring
 - if there is evasion on the card
 - what type of body it is : creature, token, permanent that becomes a body under certain conditions, instant/sorcery spell that generate a body
 - condition : the condition of obtention of the body
+Bodies and quasi-bodies (bodies appearing under conditions: crew / "becomes a creature", death or attack
+triggers, activated token makers, manifest, recursion) are classified for a whole set at once (classify_bodies)
 """
 
+import re
+import threading
+import time
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
+from typing import Tuple
 
 # Load all dependent features
 from .mixin import *
+from .parser import parse_text, normalize_set_texts, _parse_normalized_text
+
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'x': 0}
+TOKEN = re.compile(r"\bcreates? (a|an|one|two|three|four|five|x|\d+) (?:tapped )?(?:and attacking )?(\d+|x)/(\d+|x) [^.]*?creature tokens?")
+BECOMES_CREATURE = re.compile(r"\bbecomes? (?:a|an) (?:(\d+|x)/(\d+|x) )?[^.]*?creature\b")
+RECURSION = re.compile(r"\breturn cardname from your graveyard to the battlefield")
+CREW = re.compile(r"^crew (\d+)")
+TRIGGER_CONDITION = re.compile(r"^when(?:ever)? (?:cardname|this [a-z]+) (enters|dies|attacks|blocks|leaves)")
+
+BODY_COLUMNS = ['is_body', 'is_quasi_body', 'body_type', 'condition', 'body_power', 'body_toughness']
+
+# LRU cache of the classification, keyed by (normalized text, types, power, toughness), bounded to
+# BODY_CACHE_SIZE entries and shared by the threads of prefetch_sets / CatalogService
+BODY_CACHE_SIZE = 1 << 16
+_BODY_CACHE: OrderedDict = OrderedDict()
+_BODY_LOCK = threading.Lock()
+
+def _to_int(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    return NUMBER_WORDS.get(value, 0)
+
+def _token_stats(text: str):
+    # (count, power, toughness) of the first creature token created in `text`, or None
+    m = TOKEN.search(text)
+    if m is None:
+        return None
+    return _to_int(m.group(1)), _to_int(m.group(2)), _to_int(m.group(3))
+
+def _classify_body(parsed, types: Tuple[str, ...], power: float, toughness: float) -> tuple:
+    """
+    Classification of one card: (is_body, is_quasi_body, body_type, condition, body_power, body_toughness).
+    P/T of token makers are the total P/T of the tokens created (added to the card's own P/T for creatures).
+    """
+    is_creature = 'Creature' in types
+    is_permanent = any(t in types for t in ('Land', 'Creature', 'Artifact', 'Enchantment', 'Planeswalker', 'Battle'))
+    is_spell = 'Instant' in types or 'Sorcery' in types
+
+    body = None
+    quasi = None
+    for a in parsed.abilities:
+        effects = (a.effect,) + a.modes
+        tokens = next((t for t in map(_token_stats, effects) if t), None)
+        trigger = TRIGGER_CONDITION.match(a.trigger) if a.kind == 'triggered' else None
+
+        if tokens and is_spell and a.kind == 'static' and body is None:
+            n, p, t = tokens
+            body = ('Non-permanent with creature token', 'cast', n * p, n * t)
+        elif tokens and trigger and trigger.group(1) == 'enters' and is_permanent and body is None:
+            n, p, t = tokens
+            kind = 'Creature with ETB creature token' if is_creature else 'Non-creature with ETB creature token'
+            body = (kind, 'ETB', power * is_creature + n * p, toughness * is_creature + n * t)
+        elif tokens and trigger and quasi is None:
+            n, p, t = tokens
+            quasi = (f'Token on {trigger.group(1)}', trigger.group(1), n * p, n * t)
+        elif tokens and a.kind == 'activated' and quasi is None:
+            n, p, t = tokens
+            quasi = ('Activated creature token', a.cost, n * p, n * t)
+        elif a.kind == 'keyword' and CREW.match(a.text) and quasi is None:
+            quasi = ('Vehicle', f'crew {CREW.match(a.text).group(1)}', power, toughness)
+        elif quasi is None and any(BECOMES_CREATURE.search(e) for e in effects) and not is_creature:
+            m = next(BECOMES_CREATURE.search(e) for e in effects if BECOMES_CREATURE.search(e))
+            p = _to_int(m.group(1)) if m.group(1) else power
+            t = _to_int(m.group(2)) if m.group(2) else toughness
+            quasi = ('Becomes a creature', a.cost or a.trigger or 'static', p, t)
+        elif quasi is None and any('manifest' in e for e in effects):
+            quasi = ('Manifest', a.cost or a.trigger or 'cast', 2, 2)
+        elif quasi is None and is_creature and any(RECURSION.search(e) for e in effects):
+            quasi = ('Recursion', a.cost or a.trigger, power, toughness)
+
+    if body is None and is_creature:
+        body = ('Creature', None, power, toughness)
+    if body is not None:
+        return (True, quasi is not None) + body
+    if quasi is not None:
+        return (False, True) + quasi
+    return (False, False, None, None, np.nan, np.nan)
+
+def classify_bodies(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classifies the bodies and quasi-bodies of all the cards of a set, in one pass over the distinct cards.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        Cards as returned by `load_set` (columns 'name', 'text', 'types', 'power', 'toughness', and 'normalizedText' if available).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Indexed like `cards`, columns:
+        - 'is_body' (bool): creature, or card creating creature tokens on ETB / on cast
+        - 'is_quasi_body' (bool): card giving a body under a condition (crew, becomes a creature, death / attack triggers, activated tokens, manifest, recursion)
+        - 'body_type' (str), 'condition' (str): what the body is and how it is obtained
+        - 'body_power', 'body_toughness' (float): P/T of the resulting body (total of the tokens created)
+    """
+    texts = cards['normalizedText'] if 'normalizedText' in cards else normalize_set_texts(cards)
+    texts = texts.fillna('').astype(str)
+    types = [tuple(t) if isinstance(t, (list, tuple, np.ndarray)) else () for t in cards['types']]
+    power = pd.to_numeric(cards['power'], errors='coerce').fillna(0).to_numpy(float)
+    toughness = pd.to_numeric(cards['toughness'], errors='coerce').fillna(0).to_numpy(float)
+
+    keys = list(zip(texts, types, power, toughness))
+    found, missing = {}, []
+    with _BODY_LOCK:
+        for k in dict.fromkeys(keys):
+            if k in _BODY_CACHE:
+                _BODY_CACHE.move_to_end(k)
+                found[k] = _BODY_CACHE[k]
+            else:
+                missing.append(k)
+    for k in missing:
+        found[k] = _classify_body(parse_text(k[0]), *k[1:])
+    if missing:
+        with _BODY_LOCK:
+            for k in missing:
+                _BODY_CACHE[k] = found[k]
+            while len(_BODY_CACHE) > BODY_CACHE_SIZE:
+                _BODY_CACHE.popitem(last=False)
+    records = [found[k] for k in keys]
+
+    result = pd.DataFrame.from_records(records, index=cards.index, columns=BODY_COLUMNS)
+    result[['is_body', 'is_quasi_body']] = result[['is_body', 'is_quasi_body']].astype(bool)
+    result[['body_power', 'body_toughness']] = result[['body_power', 'body_toughness']].astype(float)
+    return result
+
+def benchmark_bodies(cards: pd.DataFrame, repeat: int = 3) -> pd.DataFrame:
+    """
+    Times `classify_bodies` on a catalog (ie. all the sets loaded with restriction='all' and concatenated),
+    against one parsing pass over the same texts. The parser and body caches are cleared before each cold run.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Best time (s) of: 'parse' (parsing the distinct normalized texts), 'classify_cold' (classify_bodies with
+        empty caches, parsing included), 'classify_parsed' (classify_bodies with the parser cache warm, ie. the
+        cost on top of parsing) and 'classify_warm' (all caches warm), with the number of cards and distinct texts.
+
+    Example:
+    --------
+    catalog = pd.concat([load_set(allSets, code, restriction='all') for code in allSets.index])
+    benchmark_bodies(catalog)
+    """
+    texts = cards['normalizedText'] if 'normalizedText' in cards else normalize_set_texts(cards)
+    texts = texts.fillna('').astype(str).unique()
+
+    def parse():
+        _parse_normalized_text.cache_clear()
+        for t in texts:
+            parse_text(t)
+
+    def classify_cold():
+        with _BODY_LOCK:
+            _BODY_CACHE.clear()
+        _parse_normalized_text.cache_clear()
+        classify_bodies(cards)
+
+    def classify_parsed():
+        with _BODY_LOCK:
+            _BODY_CACHE.clear()
+        classify_bodies(cards)
+
+    def best(f, setup=None):
+        timings = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            f()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    return pd.DataFrame({
+        'time_s': [
+            best(parse),
+            best(classify_cold),
+            best(classify_parsed, setup=parse),
+            best(lambda: classify_bodies(cards)),
+        ],
+        'n_cards': len(cards),
+        'n_texts': len(texts),
+    }, index=['parse', 'classify_cold', 'classify_parsed', 'classify_warm'])
 
 class BodyFeatures(CardMixin):
-    def __init__(self, card: pd.Series):
-        super().__init__(card)
+    def __init__(self, card: pd.Series, store=None):
+        super().__init__(card, store)
         self.body_features = pd.Series({
             'power': None,      #int
             'toughness': None,  #int
@@ -26,6 +216,13 @@ class BodyFeatures(CardMixin):
             'body_type': None,  #List[str]
             'condition': None   #List[str]
         })
+        bodies = self.stored_feature('bodies')
+        if bodies is None:
+            bodies = classify_bodies(self.card.to_frame().T).iloc[0]
+        self.body_features['power'] = bodies['body_power']
+        self.body_features['toughness'] = bodies['body_toughness']
+        self.body_features['body_type'] = bodies['body_type']
+        self.body_features['condition'] = bodies['condition']
 
     def is_evasive(self):
         EVASION_KEYWORDS = [
@@ -41,81 +238,3 @@ class BodyFeatures(CardMixin):
         # add unblockables ('can't be blocked')
     
         return False
-    
-    """
-    def getBodyStats(self):
-        def findTokenPowerToughness(text: str) -> Tuple[int, int]:
-            pattern = r'creat(e|es).*?(\b(?:\d+|X)/(?:\d+|X)\b).*?creature token'
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            
-            if match:
-                # Extract the power/toughness string (e.g., "2/2" or "X/3")
-                power, toughness = match.group(2).split('/')
-                
-                # Convert to integer if possible, or return 0 if 'X' is found
-                power_int = int(power) if power.isdigit() else 0
-                toughness_int = int(toughness) if toughness.isdigit() else 0
-                
-                return power_int, toughness_int
-            else:
-                return 0, 0  # Return (0, 0) if no match is found
-        
-        # --- CASES ---
-        ## - 1. Creature only -
-        filter1 = (
-            isType(card['types'], ['Creature']) 
-            & (not createsToken(card['text'])) 
-        )
-
-        if filter1==True:
-            bdType = 'Creature'
-            bdManaValue = card['manaValue']
-            bdPower = card['power']
-            bdToughness = card['toughness']
-        
-        ## - 2. creature that creates a creature token on ETB -
-        filter2 = (
-            isType(card['types'], ['Creature']) 
-            & createsToken(card['text']) 
-            & isETB(card['text'])
-        ) 
-        
-        if filter2==True:
-            bdType = 'Creature with ETB creature token'
-            bdManaValue = card['manaValue']
-
-            p, t = findTokenPowerToughness(card['text'])
-            bdPower = card['power'] + p
-            bdToughness = card['toughness'] + t
-
-        ## - 3. permanent that creates a creature token on ETB -
-        filter3 = (
-            isPermanent(card['types']) 
-            & createsToken(card['text']) 
-            & isETB(card['text'])
-        ) 
-
-        if filter3==True:
-            bdType = 'Non-creature with ETB creature token'
-            bdManaValue = card['manaValue']
-            
-            p, t = findTokenPowerToughness(card['text'])
-            bdPower = card['power'] + p
-            bdToughness = card['toughness'] + t
-
-        ## - 4. instant / sorcery spell that creates a creature token -
-        filter4 = (
-            isType(card['types'], ['Instant', 'Sorcery']) 
-            & createsToken(card['text']) 
-        ) 
-
-        if filter4==True:
-            bdType = 'Non-permanent with creature token'
-            bdManaValue = card['manaValue']
-            
-            p, t = findTokenPowerToughness(card['text'])
-            bdPower = p
-            bdToughness = t
-
-        return bdType, bdManaValue, bdPower, bdToughness 
-        """
\ No newline at end of file
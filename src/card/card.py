@@ -17,16 +17,17 @@ from .manaprod import *
 
 class Card(CardMixin):
     # Initialization
-    def __init__(self, card: pd.Series) -> None:
-        super().__init__(card)
+    def __init__(self, card: pd.Series, store=None) -> None:
+        super().__init__(card, store)
         
         # Composed features
+        # (the full card is passed for its uuid, used to read the precomputed features of the store)
         if self.is_body():
-            self.body = BodyFeatures(self.card)
+            self.body = BodyFeatures(card, store)
         if self.is_interaction():
-            self.interaction = InteractionFeatures(self.card)
+            self.interaction = InteractionFeatures(card, store)
         if self.is_mana_producer():
-            self.manaprod = ManaProducerFeatures(self.card)
+            self.manaprod = ManaProducerFeatures(card, store)
 
     # Dunder and general methods
     def __repr__(self) -> str:
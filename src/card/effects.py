@@ -4,47 +4,51 @@
 """
 All code related to the class Effects()
 Defines the effects generated by a of Magic: the Gathring printed card
-Reads the text of the card
+Reads the parsed text of the card (see parser.py): abilities without reminder text
+Each effect is a named rule of the registry RULES (see rules.py), callable as a method: Effects(text).is_removal()
 """
 
-import re
+import pandas as pd
 from typing import List, Dict
 
-def word_check_decorator(words: List[str]):
-    def decorator(func):
-        def wrapper(self):
-            for word in words:
-                if word in self.card_text:
-                    return True
-            return False
-        return wrapper
-    return decorator
-
-def pattern_check_decorator(patterns: List[str]):
-    def decorator(func):
-        def wrapper(self):
-            for pattern in patterns:
-                if bool(re.search(pattern, self.card_text, re.IGNORECASE | re.DOTALL)):
-                    return True
-            return False
-        return wrapper
-    return decorator
+from .parser import parse_text
+from .rules import RuleRegistry, AnyOf
+
+# Registry of all the rules used to classify card effects
+RULES = RuleRegistry()
 
 class Effects():
-    def __init__(self, card_text: str):
-        self.card_text = card_text.lower()
-    
+    registry = RULES
+
+    def __init__(self, card_text: str, card_name: str = None, types: List[str] = None, legendary: bool = False):
+        self.card_text = card_text.lower() if isinstance(card_text, str) else ''
+        # The name of the card is replaced by 'cardname' so that patterns can be anchored on it
+        self.parsed = parse_text(card_text, card_name, legendary)
+        self.types = types
+        self._results = {}
+
+    @property
+    def abilities(self):
+        return self.parsed.abilities
+
+    def check(self, rule_name: str) -> bool:
+        return self.registry.evaluate_card(rule_name, self.parsed, self.types, self._results)
+
+    def __getattr__(self, name: str):
+        # Rules of the registry are exposed as methods (ie. self.is_removal())
+        if name in type(self).registry:
+            return lambda: self.check(name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
     @classmethod
     def generate_pattern_check_methods(cls, method_dict: Dict[str, List[str]]):
         for method_name, patterns in method_dict.items():
-            method = pattern_check_decorator(patterns)(lambda self: None)
-            setattr(cls, method_name, method)
+            cls.registry.patterns(method_name, patterns)
 
     @classmethod
     def generate_word_check_methods(cls, method_dict: Dict[str, List[str]]):
         for method_name, words in method_dict.items():
-            method = word_check_decorator(words)(lambda self: None)
-            setattr(cls, method_name, method)
+            cls.registry.words(method_name, words)
 
 # Dictionary mapping method names to lists of words to checks
 word_check_method_dict = {
@@ -61,14 +65,36 @@ Effects.generate_word_check_methods(word_check_method_dict)
 
 # Dictionary mapping method names to lists of text patterns to checks
 pattern_check_method_dict = {
-    "is_ETB": [r"when .*? ente(r|rs)"],
-    "creates_token": [r"creat(e|es) .*? creature token"],
-    "produces_mana": [r"add (?:\d+|one|two|three|four|five) mana", r"add {"]
+    "is_ETB": [
+        # Anchored on the start of the ability (after an optional ability word: "eerie — whenever ...")
+        r"^(?:[a-z0-9' ,-]+ — )?when(?:ever)? (?:cardname|this [a-z]+)(?: or [^,.]+)? enters",
+        # Text not normalized (no card name given): the card name itself, not a generic subject ("a creature", ...)
+        r"^(?:[a-z0-9' ,-]+ — )?when(?:ever)? (?!(?:a|an|another|one|two|three|each|any|other|no|up|target|that|it|they|you|enchanted|equipped) )[^.]+? enters",
+    ],
+    "creates_token": [r"\bcreat(e|es) [^.]*?creature token"],
+    "produces_mana": [r"add (?:\d+|one|two|three|four|five) mana", r"add {", r"creat(e|es) .*?treasure token"]
 }
 Effects.generate_pattern_check_methods(pattern_check_method_dict)
 
+# Combined rules
+RULES.all_of('is_interaction', ['is_targeting', AnyOf(('is_removal', 'is_damage', 'is_sacrifice', 'is_counter'))])
+
+EFFECT_RULES = list(word_check_method_dict) + list(pattern_check_method_dict)
+
+def effect_flags(texts: pd.Series, names: pd.Series = None, rules: List[str] = None) -> pd.DataFrame:
+    """
+    Evaluates Effects rules (default: EFFECT_RULES) on a whole column of card texts at once,
+    with the compiled plan of the registry: each distinct text is parsed and evaluated only once.
+    If `names` is given, self-references are normalized first (or pass the column 'normalizedText' of `load_set`).
+    Returns a boolean DataFrame (one column per rule) aligned on the index of `texts`.
+    """
+    cards = pd.DataFrame({'text': texts})
+    if names is not None:
+        cards['name'] = names
+    return RULES.evaluate(cards, EFFECT_RULES if rules is None else rules)
+
 def main():
     ...
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
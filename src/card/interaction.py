@@ -4,12 +4,136 @@
 """
 All code related to the class InteractionFeatures()
 Describes the interaction effects of a of Magic: the Gathring printed card
+- hard removal (destroy / exile target)
+- damage-based removal, with the amount of damage
+- bounce
+- stun / tap
+- counterspell
+- fight
+- edict (forced sacrifice)
+- combat trick
+Classification is done in batch for a whole set (classify_interactions) and cached,
+InteractionFeatures reads the same cached result for single cards
 """
 
+import re
+import threading
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
 
 from .mixin import *
+from .parser import parse_text, normalize_set_texts
+from .rules import Patterns, AllOf, Types, AnyOf
+from .effects import RULES
+
+INTERACTION_TYPES = ['hard_removal', 'damage', 'bounce', 'tap_stun', 'counterspell', 'fight', 'edict', 'combat_trick']
+
+RULES.patterns('interaction_hard_removal', [
+    r"\b(?:destroy|exile) (?:up to (?:one|two|three) )?(?:another )?target (?!spell|card)",
+    r"\b(?:destroy|exile) all (?:creatures|nonland permanents|other creatures)",
+    r"\btarget creature [^.]*?gets -\d+/-\d+",
+])
+RULES.patterns('interaction_damage', [
+    r"\bdeals? (?:\d+|x) damage to (?:any target|(?:up to \w+ )?(?:another )?target|each creature)",
+    r"\bdeals? damage equal to [^.]*? to (?:any target|(?:another )?target)",
+])
+RULES.patterns('interaction_bounce', [
+    r"\breturn (?:up to \w+ )?(?:another )?target (?!card)[^.]*? to (?:its|their) owner(?:'s|s') hands?",
+])
+RULES.patterns('interaction_tap_stun', [
+    r"\btap (?:up to \w+ )?(?:another )?target",
+    r"\bdoesn't untap",
+    r"\bstun counters?",
+    r"\btarget creature [^.]*?can't (?:attack|block)",
+])
+RULES.patterns('interaction_counterspell', [
+    r"\bcounter (?:target|that|up to)\b",
+    r"\bexile target spell\b",
+])
+RULES.patterns('interaction_fight', [r"\bfights?\b"])
+RULES.patterns('interaction_edict', [
+    r"\b(?:each opponent|target opponent|target player|each player) sacrifices?\b",
+])
+RULES.all_of('interaction_combat_trick', [
+    Types(('Instant',)),
+    Patterns((
+        r"\btarget creature [^.]*?gets \+\d+/\+\d+",
+        r"\btarget creature [^.]*?gains (?!control)",
+        r"\bcreatures you control get \+\d+/\+\d+",
+    )),
+])
+INTERACTION_RULES = [f'interaction_{t}' for t in INTERACTION_TYPES]
+
+DAMAGE_AMOUNT = re.compile(r"\bdeals? (\d+) damage to (?:any target|(?:up to \w+ )?(?:another )?target|each creature)")
+
+# LRU cache of the classification, keyed by (normalized text, types), bounded to INTERACTION_CACHE_SIZE entries
+# (an OrderedDict rather than lru_cache, since the missing keys are classified in one RULES.evaluate batch)
+INTERACTION_CACHE_SIZE = 1 << 16
+_INTERACTION_CACHE: OrderedDict = OrderedDict()
+_INTERACTION_LOCK = threading.Lock()
+DAMAGE = INTERACTION_TYPES.index('damage')
+
+def _damage_amount(parsed) -> float:
+    # Largest fixed amount of damage dealt by the card (NaN if none, or only X / "equal to" damage)
+    amounts = [int(m) for a in parsed.abilities for m in DAMAGE_AMOUNT.findall(a.text)]
+    return float(max(amounts)) if amounts else np.nan
+
+def classify_interactions(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Labels the interaction of each card of a set.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        Cards as returned by `load_set` (columns 'name', 'text', 'types', and 'normalizedText' if available).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Indexed like `cards`, with one boolean column per type of INTERACTION_TYPES,
+        'damage_amount' (float, NaN when not a fixed amount) and 'interaction_type'
+        (the first matching type of INTERACTION_TYPES, or None).
+    """
+    texts = cards['normalizedText'] if 'normalizedText' in cards else normalize_set_texts(cards)
+    texts = texts.fillna('').astype(str)
+    types = [tuple(t) if isinstance(t, (list, tuple, np.ndarray)) else () for t in cards['types']]
+    keys = list(zip(texts, types))
+
+    found, missing = {}, []
+    with _INTERACTION_LOCK:
+        for k in dict.fromkeys(keys):
+            if k in _INTERACTION_CACHE:
+                _INTERACTION_CACHE.move_to_end(k)
+                found[k] = _INTERACTION_CACHE[k]
+            else:
+                missing.append(k)
+    if missing:
+        todo = pd.DataFrame({
+            'normalizedText': [t for t, _ in missing],
+            'types': [list(ty) for _, ty in missing],
+        })
+        flags = RULES.evaluate(todo, INTERACTION_RULES).to_numpy()
+        for key, row in zip(missing, flags):
+            amount = _damage_amount(parse_text(key[0])) if row[DAMAGE] else np.nan
+            label = INTERACTION_TYPES[int(np.argmax(row))] if row.any() else None
+            found[key] = tuple(bool(v) for v in row) + (amount, label)
+        with _INTERACTION_LOCK:
+            for key in missing:
+                _INTERACTION_CACHE[key] = found[key]
+            while len(_INTERACTION_CACHE) > INTERACTION_CACHE_SIZE:
+                _INTERACTION_CACHE.popitem(last=False)
+
+    records = [found[k] for k in keys]
+    result = pd.DataFrame.from_records(records, index=cards.index, columns=INTERACTION_TYPES + ['damage_amount', 'interaction_type'])
+    result[INTERACTION_TYPES] = result[INTERACTION_TYPES].astype(bool)
+    result['damage_amount'] = result['damage_amount'].astype(float)
+    return result
 
 class InteractionFeatures(CardMixin):
-    def __init__(self, card: pd.Series):
-        super().__init__(card)
+    def __init__(self, card: pd.Series, store=None):
+        super().__init__(card, store)
+        self.interaction_features = classify_interactions(self.card.to_frame().T).iloc[0]
+
+    def interaction_type(self):
+        return self.interaction_features['interaction_type']
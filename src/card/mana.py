@@ -0,0 +1,158 @@
+# src/card/mana.py
+# author: @taryaksama
+
+"""
+Mana symbol tokenizer shared by the mana cost analysis and the mana production parsing
+- a braced string ('{2}{W/U}{W/U}') is split into symbols without regular expressions
+- each symbol is interned once: it gets an integer id, and its properties (colors, generic amount, ...)
+  are computed once for that id
+- tokenization is memoized per distinct cost string (there are few distinct mana costs in the whole catalog);
+  card texts are nearly all distinct, so the scans of the texts are not memoized
+"""
+
+import re
+import threading
+import time
+import pandas as pd
+from functools import lru_cache
+from typing import List, Tuple
+
+COLORS = 'WUBRG'
+COLOR_BIT = {c: 1 << i for i, c in enumerate(COLORS)} # same bits as COLOR_BITS of card_analyzer
+
+# Interned symbols: id -> symbol, symbol -> id, and the properties of each id
+SYMBOLS: List[str] = []
+SYMBOL_IDS = {}
+SYMBOL_COLORS: List[int] = []    # bitmask of the colors of the symbol (hybrid symbols have several)
+SYMBOL_GENERIC: List[int] = []   # generic amount ({3} -> 3, {X} -> 0)
+SYMBOL_RESIDUAL: List[int] = []  # characters kept by isMultiPip (not C, X or a digit)
+
+_INTERN_LOCK = threading.Lock() # the symbol tables are shared by the worker threads (prefetch, service, pipeline)
+
+def intern_symbol(symbol: str) -> int:
+    """
+    Id of a symbol (the text between braces, ie. 'W/U'), registered at first use.
+    """
+    symbol_id = SYMBOL_IDS.get(symbol)
+    if symbol_id is None:
+        with _INTERN_LOCK:
+            symbol_id = SYMBOL_IDS.get(symbol)
+            if symbol_id is None:
+                # Properties are appended before the id is published, so a reader never sees a partial entry
+                SYMBOL_COLORS.append(sum(bit for c, bit in COLOR_BIT.items() if c in symbol))
+                SYMBOL_GENERIC.append(int(symbol) if symbol.isdigit() else 0)
+                SYMBOL_RESIDUAL.append(sum(1 for c in symbol if c not in 'CX' and not c.isdigit()))
+                SYMBOLS.append(symbol)
+                symbol_id = len(SYMBOLS) - 1
+                SYMBOL_IDS[symbol] = symbol_id
+    return symbol_id
+
+@lru_cache(maxsize=None)
+def tokenize_cost(cost: str) -> Tuple[int, ...]:
+    """
+    Ids of the symbols of a braced string ('{2}{W/U}{W/U}' -> ids of '2', 'W/U', 'W/U').
+    Characters outside braces are kept as one-character symbols.
+    """
+    tokens = []
+    i, n = 0, len(cost)
+    while i < n:
+        if cost[i] == '{':
+            j = cost.find('}', i + 1)
+            if j == -1:
+                j = n
+            tokens.append(intern_symbol(cost[i + 1:j]))
+            i = j + 1
+        else:
+            if cost[i] != '}':
+                tokens.append(intern_symbol(cost[i]))
+            i += 1
+    return tuple(tokens)
+
+@lru_cache(maxsize=None)
+def cost_pips(cost: str) -> Tuple[int, ...]:
+    """
+    Colored pips of each color of COLORS in a mana cost (a hybrid pip counts for each of its colors).
+    """
+    counts = [0] * len(COLORS)
+    for t in tokenize_cost(cost):
+        colors = SYMBOL_COLORS[t]
+        for i in range(len(COLORS)):
+            if colors >> i & 1:
+                counts[i] += 1
+    return tuple(counts)
+
+def cost_residual(cost: str) -> int:
+    # Number of characters of the cost that are not braces, C, X or digits (see isMultiPip)
+    return sum(SYMBOL_RESIDUAL[t] for t in tokenize_cost(cost))
+
+ADD_SYMBOL = re.compile(r'add\s*\{([^{}]+)\}')
+
+def added_symbols(text: str) -> Tuple[int, ...]:
+    r"""
+    Ids of the symbols directly following 'add' in a card text ('add {G}' -> id of 'G'), the symbols found
+    by `re.findall(r'add\s*\{([^{}]+)\}', text)` interned. Case sensitive, like the regex.
+    """
+    matches = ADD_SYMBOL.findall(text)
+    return tuple(map(intern_symbol, matches)) if matches else ()
+
+def produced_colors(text: str) -> int:
+    """
+    Bitmask (COLOR_BIT) of the colors in the symbols following 'add' in each sentence of a card text
+    ('{T}: Add {W} or {U}.' -> W | U). Not case sensitive.
+    """
+    colors = 0
+    for sentence in text.lower().replace('\n', '.').split('.'):
+        i = sentence.find('add ')
+        if i == -1:
+            continue
+        j = sentence.find('{', i)
+        while j != -1:
+            k = sentence.find('}', j + 1)
+            if k == -1:
+                break
+            colors |= SYMBOL_COLORS[intern_symbol(sentence[j + 1:k].upper())]
+            j = sentence.find('{', k + 1)
+    return colors
+
+def benchmark_tokenizer(costs: pd.Series, texts: pd.Series, repeat: int = 3) -> pd.DataFrame:
+    """
+    Compares the tokenizer with the previous character filtering / regex implementations on a catalog
+    (ie. `manaCost` and `text` of all the cards). The cost tokenizer cache is cleared before each tokenizer run.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Best time (s) of each implementation, for the multi-pip check and the added mana symbols.
+    """
+    costs = [c for c in costs if isinstance(c, str)]
+    texts = [t for t in texts if isinstance(t, str)]
+    pattern = re.compile(r'add\s*\{([^{}]+)\}')
+
+    def filter_multipip():
+        return [len(''.join(ch for ch in c if ch not in ['{', '}', 'C', 'X'] and not ch.isdigit())) > 1 for c in costs]
+
+    def token_multipip():
+        tokenize_cost.cache_clear()
+        return [cost_residual(c) > 1 for c in costs]
+
+    def regex_added():
+        return [pattern.findall(t) for t in texts]
+
+    def token_added():
+        return [[SYMBOLS[s] for s in added_symbols(t)] for t in texts]
+
+    if filter_multipip() != token_multipip() or regex_added() != token_added():
+        raise AssertionError('The tokenizer does not match the previous implementation')
+
+    def best(f):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            f()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    return pd.DataFrame({
+        'previous_s': [best(filter_multipip), best(regex_added)],
+        'tokenizer_s': [best(token_multipip), best(token_added)],
+    }, index=['isMultiPip', 'added_mana'])
@@ -8,6 +8,7 @@ Calculates properties of cards that can produce mana with the following properti
 - manaprod_type, color and amount of mana produced
 """
 
+import numpy as np
 import pandas as pd
 import re
 from typing import List, Dict
@@ -17,16 +18,22 @@ from .__config__ import MANA_COLORS
 
 # Load all dependent features
 from .mixin import *
+from .mana import ADD_SYMBOL
 
 class ManaProducerFeatures(CardMixin):
-    def __init__(self, card:pd.Series):
-        super().__init__(card)
+    def __init__(self, card:pd.Series, store=None):
+        super().__init__(card, store)
         # self.card = card
         #self.effects = Effects(self.card['text'])
         self.manaprod_features = pd.Series({
             'manaprod_type': None,                   #List[str]
             'mana_produced': MANA_COLORS.copy(),   #Dict[str, int]
         })
+        # Mana production precomputed in the FeatureStore (mana_production_matrix), if any
+        stored = self.stored_feature('manaprod')
+        self._stored_manaprod = stored is not None
+        if self._stored_manaprod:
+            self.manaprod_features['mana_produced'] = {c: int(stored[c]) for c in MANA_COLORS}
 
     def producer_type(self) -> None:
         # Non-basic Lands
@@ -55,9 +62,11 @@ class ManaProducerFeatures(CardMixin):
         # /!\ Here does not account for any other manaprod_type of mana production (ie. Dark Ritual)
 
     def mana_produced(self) -> None:
+        if self._stored_manaprod:
+            return
         card_text = self.card['text']
 
-        matches = re.findall(r'add\s*\{([^{}]+)\}', card_text)
+        matches = ADD_SYMBOL.findall(card_text)
         if matches:
             for mana_color in matches:
                 if mana_color.isdigit():
@@ -77,4 +86,28 @@ class ManaProducerFeatures(CardMixin):
                     'four': 4, 
                     'five': 5,
                     }
-                self.manaprod_features['mana_produced']["ALL"] += WORD_TO_INT[matches[0]]
\ No newline at end of file
+                self.manaprod_features['mana_produced']["ALL"] += WORD_TO_INT[matches[0]]
+
+WORD_TO_INT = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5}
+ADD_AMOUNT = re.compile(r"add (\d+|one|two|three|four|five) mana")
+
+def mana_production_matrix(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Batch version of ManaProducerFeatures.mana_produced() for a whole set: one row per card,
+    one column per key of MANA_COLORS, each distinct text being read once.
+    """
+    texts = cards['text'].fillna('').astype(str)
+    colors = list(MANA_COLORS)
+    produced = {}
+    for text in texts.unique():
+        row = dict.fromkeys(colors, 0)
+        lowered = text.lower()
+        for mana_color in ADD_SYMBOL.findall(lowered):
+            mana_color = 'C' if mana_color.isdigit() else mana_color.upper()
+            if mana_color in row:
+                row[mana_color] += 1
+        amounts = ADD_AMOUNT.findall(lowered)
+        if amounts:
+            row['ALL'] += int(amounts[0]) if amounts[0].isdigit() else WORD_TO_INT[amounts[0]]
+        produced[text] = [row[c] for c in colors]
+    return pd.DataFrame([produced[t] for t in texts], index=cards.index, columns=colors, dtype=np.int16)
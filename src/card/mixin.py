@@ -14,11 +14,32 @@ from .__config__ import FEATURES_ANALYZED, MANA_COLORS
 
 # Load all dependent features
 from .effects import *
+from .parser import is_legendary
+from .mana import COLORS, cost_pips
 
 class CardMixin():
-    def __init__(self, card: pd.Series):
+    def __init__(self, card: pd.Series, store=None):
         self.card = card[FEATURES_ANALYZED]
-        self.effects = Effects(self.card['text'])
+        self.store = store
+        self.uuid = card['uuid'] if 'uuid' in card else None
+        self.effects = Effects(self.card['text'], self.card['name'], self.card['types'], is_legendary(card.get('supertypes')))
+        # Precomputed Effects flags (FeatureStore) are used instead of re-evaluating the rules
+        if store is not None and self.uuid is not None:
+            self.effects._results.update(store.card_effects(self.uuid))
+
+    def stored_feature(self, name: str):
+        # Precomputed feature `name` of the card in the FeatureStore ('bodies', 'manaprod', 'pips', ...), or None
+        if self.store is None or self.uuid is None:
+            return None
+        return self.store.card_feature(self.uuid, name)
+
+    def pips(self) -> Dict[str, int]:
+        # Colored pips of each color in the mana cost (hybrid pips count for each of their colors)
+        stored = self.stored_feature('pips')
+        if stored is not None:
+            return {c: int(stored[c]) for c in COLORS}
+        cost = self.card['manaCost']
+        return dict(zip(COLORS, cost_pips(cost if isinstance(cost, str) else '')))
 
     def is_type(self, typelist: List[str]) -> bool:
         return any(t in self.card['types'] for t in typelist)
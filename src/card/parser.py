@@ -0,0 +1,195 @@
+# src/card/parser.py
+# author: @taryaksama
+
+"""
+All code related to the parsing of the text of a Magic: the Gathring printed card
+Splits the text in abilities (keyword, static, triggered, activated), strips the reminder text
+and stores a compact tree per card, read by Effects instead of re-scanning the raw text
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple, FrozenSet
+
+TRIGGER_WORDS = ('when ', 'whenever ', 'at ')
+REMINDER_TEXT = re.compile(r'\s*\([^()]*\)')
+QUOTED_TEXT = re.compile(r'"[^"]*"')
+ABILITY_WORD = re.compile(r"^[a-z0-9' ,-]+ — (?=\S)")
+# "counter" used as a noun (+1/+1 counter, loyalty counters, ...), not the "counter target spell" verb
+NOUN_COUNTER = re.compile(r"(?:[+-]\d+/[+-]\d+|\b(?:a|an|one|two|three|x|\d+|that many|each|no|loyalty|charge|lore|oil|shield|stun|time|poison|energy)(?: [a-z+/0-9-]+)?) counters?\b")
+WORD = re.compile(r"[a-z][a-z'-]*")
+SELF_REFERENCE = 'CARDNAME' # placeholder replacing the name of the card in its own text
+
+@dataclass(frozen=True, slots=True)
+class Ability():
+    kind: str                       # 'keyword', 'static', 'triggered' or 'activated'
+    text: str                       # full ability, lowercased, without reminder text
+    cost: str = ''                  # activated abilities: what is left of ':'
+    trigger: str = ''               # triggered abilities: the trigger condition
+    effect: str = ''                # what the ability does
+    modes: Tuple[str, ...] = ()     # modal abilities ("choose one —"): one entry per bullet
+    granted: Tuple[str, ...] = ()   # quoted abilities granted to other objects (ie. tokens)
+
+@dataclass(frozen=True, slots=True)
+class ParsedText():
+    abilities: Tuple[Ability, ...]
+    words: FrozenSet[str]           # words (and simple stems) of costs, triggers, effects, modes and granted abilities
+
+    @property
+    def rules_text(self) -> str:
+        return '\n'.join(a.text for a in self.abilities)
+
+    def kinds(self) -> Tuple[str, ...]:
+        return tuple(a.kind for a in self.abilities)
+
+def _split_outside_quotes(line: str, sep: str) -> Tuple[str, str]:
+    # Position of the first `sep` which is not inside a quoted ability
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == sep and not in_quotes:
+            return line[:i], line[i + 1:]
+    return '', line
+
+def _is_keyword_line(line: str) -> bool:
+    # ie. "flying, vigilance", "crew 1", "equip {2}", "flash"
+    return not any(c in line for c in '.:"—') and not line.startswith(TRIGGER_WORDS) and len(line.split()) <= 6
+
+def _stems(word: str):
+    yield word
+    for suffix, replacement in (('ies', 'y'), ('es', ''), ('s', ''), ('ed', ''), ('d', ''), ('ing', '')):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            yield word[:-len(suffix)] + replacement
+
+def _words(*texts: str) -> FrozenSet[str]:
+    words = set()
+    for text in texts:
+        for w in WORD.findall(NOUN_COUNTER.sub(' ', text)):
+            words.update(_stems(w))
+    return frozenset(words)
+
+def _parse_line(line: str) -> Ability:
+    granted = tuple(q.strip('"') for q in QUOTED_TEXT.findall(line))
+    if _is_keyword_line(line):
+        return Ability('keyword', line, effect=line, granted=granted)
+
+    body = ABILITY_WORD.sub('', line)
+    if body.startswith(TRIGGER_WORDS):
+        trigger, _, effect = body.partition(', ')
+        return Ability('triggered', line, trigger=trigger, effect=QUOTED_TEXT.sub('""', effect), granted=granted)
+
+    cost, effect = _split_outside_quotes(body, ':')
+    if cost and '—' not in cost:
+        return Ability('activated', line, cost=cost.strip(), effect=QUOTED_TEXT.sub('""', effect.strip()), granted=granted)
+
+    return Ability('static', line, effect=QUOTED_TEXT.sub('""', body), granted=granted)
+
+def card_name_variants(card_name: str, legendary: bool = False) -> Tuple[str, ...]:
+    """
+    Names under which a card refers to itself in its text, longest first:
+    full name, faces of split / adventure cards ("A // B") and, for legendary cards only, short names
+    ("Ghalta, Primal Hunger" -> "Ghalta").
+    """
+    if not isinstance(card_name, str) or not card_name:
+        return ()
+    variants = {card_name}
+    for face in card_name.split(' // '):
+        variants.add(face)
+        if legendary and ', ' in face:
+            variants.add(face.split(', ')[0])
+    return tuple(sorted((v for v in variants if len(v) >= 3), key=len, reverse=True))
+
+def normalize_self_references(card_text: str, card_name: str, legendary: bool = False) -> str:
+    """
+    Replaces the name of the card in its own text by SELF_REFERENCE ("When Aven Interrupter enters" -> "When CARDNAME enters").
+    """
+    if not isinstance(card_text, str):
+        return ''
+    for variant in card_name_variants(card_name, legendary):
+        card_text = card_text.replace(variant, SELF_REFERENCE)
+    return card_text
+
+def is_legendary(supertypes) -> bool:
+    return isinstance(supertypes, (list, tuple, np.ndarray)) and 'Legendary' in supertypes
+
+def normalize_set_texts(cards: pd.DataFrame) -> pd.Series:
+    """
+    Normalized text of all the cards of a set (see normalize_self_references), as a Series aligned on `cards`.
+    The variants of each distinct (name, legendary) are computed once; legendary cards are read from the
+    column 'supertypes' if present.
+
+    The replacement itself stays a loop of `str.replace`: a name only appears in its own one or two rows, so a
+    `Series.str.replace` per name group is dominated by its per-call overhead (~15x slower on 80k cards with
+    48k names), and a single regex cannot refer to the name of each row.
+    """
+    legendary = cards['supertypes'].apply(is_legendary).to_numpy() if 'supertypes' in cards else np.zeros(len(cards), dtype=bool)
+    variants = {}
+    normalized = []
+    for text, name, legend in zip(cards['text'].to_numpy(), cards['name'].to_numpy(), legendary):
+        key = (name, legend)
+        if key not in variants:
+            variants[key] = card_name_variants(name, legend)
+        if not isinstance(text, str):
+            text = ''
+        for variant in variants[key]:
+            text = text.replace(variant, SELF_REFERENCE)
+        normalized.append(text)
+    return pd.Series(normalized, index=cards.index, dtype=object)
+
+def parse_text(card_text: str, card_name: str = None, legendary: bool = False) -> ParsedText:
+    """
+    Parses the text of a card into a tuple of abilities.
+
+    - one ability per line, modal bullets ("•") attached to the previous ability as `modes`
+    - reminder text (between parentheses) is removed, unless it is the whole text of the card
+    - quoted abilities granted to other objects (tokens, equipped creatures, ...) are kept apart in `granted` and
+      removed from the `effect` of the ability granting them; their words stay in `words` (and their text in the
+      ability `text`), so the word and pattern rules still see them, as they did on the raw text
+    - if `card_name` is given, the name of the card is replaced by SELF_REFERENCE (lowercased to 'cardname'),
+      with its short name if `legendary`
+
+    Results are memoized on the text: reprints and identical texts are parsed only once.
+    """
+    if not isinstance(card_text, str):
+        card_text = ''
+    if card_name:
+        card_text = normalize_self_references(card_text, card_name, legendary)
+    return _parse_normalized_text(card_text)
+
+@lru_cache(maxsize=None)
+def _parse_normalized_text(card_text: str) -> ParsedText:
+    abilities = []
+    for raw in card_text.lower().split('\n'):
+        line = REMINDER_TEXT.sub('', raw).strip()
+        if not line:
+            continue
+        if line.startswith('•') and abilities:
+            previous = abilities[-1]
+            mode = line.lstrip('• ').strip()
+            abilities[-1] = Ability(
+                previous.kind, previous.text + '\n' + line, previous.cost, previous.trigger,
+                previous.effect, previous.modes + (mode,), previous.granted
+            )
+            continue
+        abilities.append(_parse_line(line))
+
+    # Texts made only of reminder text (ie. basic lands "({T}: Add {W}.)") are read as rules text
+    if not abilities and card_text.strip().startswith('('):
+        return _parse_normalized_text(card_text.replace('(', '').replace(')', ''))
+
+    words = _words(*(t for a in abilities for t in (a.cost, a.trigger, a.effect) + a.modes + a.granted))
+    return ParsedText(tuple(abilities), words)
+
+def parse_set(cards: pd.DataFrame) -> pd.Series:
+    """
+    Parses the text of all the cards of a set, each distinct text being parsed only once.
+    Uses the column 'normalizedText' (see `load_set`) when available.
+    Returns a Series of ParsedText aligned on the index of `cards` (ie. to store as a column 'abilities').
+    """
+    texts = (cards['normalizedText'] if 'normalizedText' in cards else normalize_set_texts(cards)).fillna('').astype(str)
+    parsed = {t: parse_text(t) for t in texts.unique()}
+    return texts.map(parsed)
@@ -0,0 +1,253 @@
+# src/card/rules.py
+# author: @taryaksama
+
+"""
+All code related to the class RuleRegistry()
+Named rules classifying the effects of Magic: the Gathring printed cards:
+- words: any of the words is in the parsed text
+- patterns: any of the regular expressions matches one ability
+- types: the card has any of the types
+- combinators: all_of / any_of / not_ over other rules
+The rules are compiled to one evaluation plan executed over a whole DataFrame, with timing per rule
+"""
+
+import re
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Union
+
+from .parser import parse_text, normalize_set_texts
+
+class Rule():
+    def dependencies(self) -> Tuple[str, ...]:
+        return ()
+
+@dataclass(frozen=True)
+class Words(Rule):
+    words: Tuple[str, ...]
+
+    def evaluate(self, ctx: '_Context') -> np.ndarray:
+        words = self.words
+        per_text = np.fromiter((any(w in p.words for w in words) for p in ctx.parsed), dtype=bool, count=len(ctx.parsed))
+        return per_text[ctx.inverse]
+
+@dataclass(frozen=True)
+class Patterns(Rule):
+    patterns: Tuple[str, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, '_compiled', [re.compile(p, re.IGNORECASE | re.DOTALL) for p in self.patterns])
+
+    def matches(self, parsed) -> bool:
+        # Patterns are matched ability by ability, so they cannot span several abilities
+        return any(c.search(a.text) for a in parsed.abilities for c in self._compiled)
+
+    def evaluate(self, ctx: '_Context') -> np.ndarray:
+        per_text = np.fromiter((self.matches(p) for p in ctx.parsed), dtype=bool, count=len(ctx.parsed))
+        return per_text[ctx.inverse]
+
+@dataclass(frozen=True)
+class Types(Rule):
+    types: Tuple[str, ...]
+
+    def evaluate(self, ctx: '_Context') -> np.ndarray:
+        types = self.types
+        return np.fromiter(
+            (isinstance(t, (list, tuple, np.ndarray)) and any(x in t for x in types) for t in ctx.types),
+            dtype=bool, count=len(ctx.types)
+        )
+
+Operand = Union[str, Rule]
+
+@dataclass(frozen=True)
+class AllOf(Rule):
+    operands: Tuple[Operand, ...]
+
+    def dependencies(self):
+        return _dependencies(self.operands)
+
+    def evaluate(self, ctx: '_Context') -> np.ndarray:
+        out = np.ones(ctx.n, dtype=bool)
+        for o in self.operands:
+            out &= ctx.value(o)
+        return out
+
+@dataclass(frozen=True)
+class AnyOf(Rule):
+    operands: Tuple[Operand, ...]
+
+    def dependencies(self):
+        return _dependencies(self.operands)
+
+    def evaluate(self, ctx: '_Context') -> np.ndarray:
+        out = np.zeros(ctx.n, dtype=bool)
+        for o in self.operands:
+            out |= ctx.value(o)
+        return out
+
+@dataclass(frozen=True)
+class Not(Rule):
+    operand: Operand
+
+    def dependencies(self):
+        return _dependencies((self.operand,))
+
+    def evaluate(self, ctx: '_Context') -> np.ndarray:
+        return ~ctx.value(self.operand)
+
+def _dependencies(operands) -> Tuple[str, ...]:
+    names = []
+    for o in operands:
+        if isinstance(o, str):
+            names.append(o)
+        else:
+            names.extend(o.dependencies())
+    return tuple(names)
+
+class _Context():
+    # State shared by the rules during one evaluation: distinct parsed texts, card types, results so far
+    def __init__(self, parsed: List, inverse: np.ndarray, types) -> None:
+        self.parsed = parsed
+        self.inverse = inverse
+        self.types = types
+        self.n = len(inverse)
+        self.results: Dict[str, np.ndarray] = {}
+
+    def value(self, operand: Operand) -> np.ndarray:
+        return self.results[operand] if isinstance(operand, str) else operand.evaluate(self)
+
+class RuleRegistry():
+    """
+    Registry of named rules.
+
+    Example:
+    --------
+    registry = RuleRegistry()
+    registry.words('is_lifegain', ['gain', 'life'])
+    registry.types('is_spell', ['Instant', 'Sorcery'])
+    registry.all_of('is_lifegain_spell', ['is_lifegain', 'is_spell'])
+    flags = registry.evaluate(cards)     # one boolean column per rule
+    registry.timing_report()             # which rules dominate the classification cost
+    """
+
+    def __init__(self) -> None:
+        self.rules: Dict[str, Rule] = {}
+        self.timings: Dict[str, List[float]] = {} # rule -> [calls, total seconds]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.rules
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def register(self, name: str, rule: Rule) -> Rule:
+        for dependency in rule.dependencies():
+            if dependency not in self.rules:
+                raise KeyError(f"Rule '{name}' depends on unknown rule '{dependency}'")
+        self.rules[name] = rule
+        return rule
+
+    def words(self, name: str, words: List[str]) -> Rule:
+        return self.register(name, Words(tuple(w.lower() for w in words)))
+
+    def patterns(self, name: str, patterns: List[str]) -> Rule:
+        return self.register(name, Patterns(tuple(patterns)))
+
+    def types(self, name: str, types: List[str]) -> Rule:
+        return self.register(name, Types(tuple(types)))
+
+    def all_of(self, name: str, operands: List[Operand]) -> Rule:
+        return self.register(name, AllOf(tuple(operands)))
+
+    def any_of(self, name: str, operands: List[Operand]) -> Rule:
+        return self.register(name, AnyOf(tuple(operands)))
+
+    def not_(self, name: str, operand: Operand) -> Rule:
+        return self.register(name, Not(operand))
+
+    def compile(self, names: List[str] = None) -> List[str]:
+        """
+        Evaluation plan: the rules to evaluate (`names` and their dependencies), each once, dependencies first.
+        """
+        plan, seen = [], set()
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dependency in self.rules[name].dependencies():
+                visit(dependency)
+            plan.append(name)
+        for name in (self.rules if names is None else names):
+            visit(name)
+        return plan
+
+    def _run(self, ctx: _Context, plan: List[str], timed: bool) -> _Context:
+        for name in plan:
+            if name in ctx.results:
+                continue
+            if timed:
+                start = time.perf_counter()
+                ctx.results[name] = self.rules[name].evaluate(ctx)
+                timing = self.timings.setdefault(name, [0, 0.0])
+                timing[0] += 1
+                timing[1] += time.perf_counter() - start
+            else:
+                ctx.results[name] = self.rules[name].evaluate(ctx)
+        return ctx
+
+    def evaluate(self, cards: pd.DataFrame, names: List[str] = None, timed: bool = True) -> pd.DataFrame:
+        """
+        Evaluates the rules `names` (default: all) on all the cards at once.
+
+        Text rules are evaluated once per distinct text (column 'normalizedText' if present, else 'text'
+        normalized with 'name' and 'supertypes'); type rules read the column 'types'.
+
+        Returns:
+        --------
+        pandas.DataFrame
+            One boolean column per rule in `names`, aligned on the index of `cards`.
+        """
+        plan = self.compile(names)
+        if 'normalizedText' in cards:
+            keys = cards['normalizedText']
+        elif 'name' in cards:
+            keys = normalize_set_texts(cards)
+        else:
+            keys = cards['text']
+
+        codes, unique = pd.factorize(keys.fillna('').astype(str).to_numpy())
+        parsed = [parse_text(t) for t in unique]
+        types = cards['types'].to_numpy() if 'types' in cards else [None] * len(cards)
+
+        ctx = self._run(_Context(parsed, np.asarray(codes), types), plan, timed)
+        names = plan if names is None else names
+        return pd.DataFrame({n: ctx.results[n] for n in names}, index=cards.index)
+
+    def evaluate_card(self, name: str, parsed, types=None, cache: Dict[str, np.ndarray] = None) -> bool:
+        """
+        Evaluates one rule for one card (already parsed text). `cache` keeps the results between calls.
+        """
+        ctx = _Context([parsed], np.zeros(1, dtype=np.int64), [types])
+        if cache is not None:
+            ctx.results = cache
+        self._run(ctx, self.compile([name]), timed=False)
+        return bool(ctx.results[name][0])
+
+    def timing_report(self) -> pd.DataFrame:
+        """
+        Cumulated evaluation time per rule, most expensive first.
+        """
+        report = pd.DataFrame({
+            'calls': {n: t[0] for n, t in self.timings.items()},
+            'total_s': {n: t[1] for n, t in self.timings.items()},
+        })
+        if report.empty:
+            return report
+        report['mean_ms'] = report['total_s'] / report['calls'] * 1000
+        report['share'] = report['total_s'] / report['total_s'].sum()
+        return report.sort_values('total_s', ascending=False)
+
+    def reset_timings(self) -> None:
+        self.timings = {}
@@ -4,20 +4,98 @@
 # All the functions necessary to analyze a card of Magic the Gathering
 # Initial data should be a Pandas DataFrame extracted from the Card (Set) model of https://mtgjson.com/data-models/card/card-set/
 
+import numpy as np
 import pandas as pd
 import re
 from typing import List
 
+from .card.body import classify_bodies
+from .card.mana import cost_pips, cost_residual
+
+COLOR_BITS = {'W': 1, 'U': 2, 'B': 4, 'R': 8, 'G': 16}
+
 class ManaProductionFeatures():
     ...
 
-"""
-def isQuasiBody(cards: pd.DataFrame) -> None:
-    # definition of a quasi-body : card that creates / becomes a body under certain conditions ('becomes a creature, ie. Crew'), should have identified power / toughness (for example, does not count recursion on targeted creatures)
-# - when you pay a cost
-# - creates tokens under conditions
-    pass
-"""    
+def isMultiPip(s, letters_to_remove=None):
+    """
+    This function checks whether a card's mana cost contains more than one colored pip 
+    (i.e., multiple colored mana symbols). It removes specified characters (such as `{`, `}`, `C`, `X`, and digits) 
+    from the mana cost string to focus on the colored mana symbols. If the resulting string length is greater than 1, 
+    it is considered a "multi-pip" mana cost.
+
+    Parameters:
+    - s: A string representing the card's mana cost.
+    - letters_to_remove: A list of characters to remove from the mana cost string. Defaults to ['{', '}', 'C', 'X'].
+
+    Returns:
+    - True if the mana cost has more than one colored pip.
+    - False otherwise.
+    """
+
+    if not isinstance(s, str):  # Handle NaN or non-string values
+        return False
+
+    if letters_to_remove is None:
+        # Default characters: read from the memoized mana symbol tokenizer (see card/mana.py)
+        return cost_residual(s) > 1
+    
+    s = ''.join(c for c in s if c not in letters_to_remove and not c.isdigit())
+    return len(s) > 1
+
+def producesMana(s): #---@dev TO BE TESTED FOR FETCH
+    """
+    This function checks if a card has text indicating it produces mana. It looks for specific phrases such as 
+    "add X mana" or "add {" to identify cards that produce mana. The function uses regular expressions to detect 
+    the presence of these patterns in the card's text.
+
+    Parameters:
+    - s: A string representing the card's text description (specifically, its ability text).
+
+    Returns:
+    - True if the card produces mana, based on the specified patterns.
+    - False otherwise.
+    """
+    if not isinstance(s, str):
+        s = ""
+    
+    pattern1 = r'add (?:\d+|one|two|three|four|five) mana'
+    match1 = re.search(pattern1, s, re.IGNORECASE)
+
+    pattern2 = r'add {'
+    match2 = re.search(pattern2, s, re.IGNORECASE)
+    
+    return bool(match1 or match2)
+
+def pipMatrix(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Counts the colored pips of each color in the mana cost of each card (hybrid pips count for each of their colors).
+    Returns an integer DataFrame indexed like `cards`, with columns 'W', 'U', 'B', 'R', 'G'.
+    """
+    costs = cards['manaCost'].fillna('').astype(str)
+    counts = np.array([cost_pips(c) for c in costs], dtype=np.int16).reshape(len(costs), len(COLOR_BITS))
+    return pd.DataFrame(counts, index=cards.index, columns=list(COLOR_BITS))
+
+def colorBitmask(colorIdentity: pd.Series) -> np.ndarray:
+    """
+    Encodes the color identity of each card as a 5-bit integer (W=1, U=2, B=4, R=8, G=16, colorless=0).
+    """
+    return np.fromiter(
+        (sum(COLOR_BITS.get(c, 0) for c in ci) if isinstance(ci, (list, tuple, np.ndarray)) else 0 for ci in colorIdentity),
+        dtype=np.int64, count=len(colorIdentity)
+    )
+
+def isQuasiBody(cards: pd.DataFrame) -> pd.Series:
+    """
+    Definition of a quasi-body : card that creates / becomes a body under certain conditions, with identified power / toughness
+    (does not count recursion on targeted creatures)
+    - when you pay a cost ('becomes a creature', Crew, activated abilities creating tokens)
+    - creates tokens under conditions (death / attack triggers)
+    - manifest, self-recursion
+
+    Returns a boolean Series aligned on `cards`, see `classify_bodies` for the type, condition and P/T of each body.
+    """
+    return classify_bodies(cards)['is_quasi_body']
 
 def main() -> None: # TBD
     ...
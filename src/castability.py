@@ -0,0 +1,228 @@
+# src/castability.py
+# author: @taryaksama
+
+# Probability of casting the cards of a set or of a deck on curve
+# Colored requirements come from the pips of `manaCost` (mana symbol tokenizer), sources from the lands and
+# mana producers of the deck; probabilities are computed once per distinct requirement (turn, pips):
+# - hypergeometric: exact per color, combined assuming independence between colors and land count (fast, any mana base)
+# - Monte-Carlo: draws shared by all the requirements of a deck, exact for its actual sources (dual lands, dorks, ...)
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import ClassVar, Dict, Optional, Tuple
+
+from .card.mana import COLORS, COLOR_BIT, cost_pips
+from .card_analyzer import producesMana
+from .set_analyzer import producedColorBitmask, MetricsRecord
+
+OPENING_HAND = 7
+MAX_TURN = 10
+
+@lru_cache(maxsize=None)
+def binomial_table(n_max: int = 128) -> np.ndarray:
+    """
+    Table of the binomial coefficients C[n, k] for 0 <= k <= n <= n_max (float64), computed once.
+    """
+    table = np.zeros((n_max + 1, n_max + 1))
+    table[:, 0] = 1
+    for n in range(1, n_max + 1):
+        table[n, 1:n + 1] = table[n - 1, :n] + table[n - 1, 1:n + 1]
+    return table
+
+def hypergeom_at_least(N, K, n, k) -> np.ndarray:
+    """
+    P(X >= k) for X hypergeometric: n cards drawn from N cards of which K are successes.
+    Vectorized over array arguments (broadcast together).
+    """
+    N, K, n, k = np.broadcast_arrays(*(np.asarray(a, dtype=np.int64) for a in (N, K, n, k)))
+    C = binomial_table(max(128, int(N.max(initial=0))))
+    # P(X = x) for all the possible x at once (last axis), summed over x >= k
+    x = np.arange(C.shape[0])
+    N, K, n, k = (a[..., None] for a in (N, K, n, k))
+    valid = (x <= K) & (x <= n) & (n - x <= N - K)
+    pmf = C[K, np.where(valid, x, 0)] * C[N - K, np.where(valid, n - x, 0)] / C[N, n]
+    return np.where(valid & (x >= k), pmf, 0).sum(axis=-1)
+
+class ManaBase():
+    """
+    Sources of mana of a deck: the number of cards, of mana sources, and of sources of each color.
+
+    Example:
+    --------
+    ManaBase(40, 17, {'W': 9, 'U': 8})          # 17 lands, 9 white and 8 blue sources
+    ManaBase.from_deck(deck)                     # counted from the lands and producers of a deck
+    """
+
+    def __init__(self, deck_size: int = 40, sources: int = 17, color_sources: Optional[Dict[str, int]] = None) -> None:
+        self.deck_size = deck_size
+        self.sources = sources
+        self.color_sources = {c: 0 for c in COLORS}
+        self.color_sources.update(color_sources or {})
+        # Color bitmask of each source card (for Monte-Carlo); by default mono-colored sources then colorless ones
+        self.source_bits = None
+
+    def __repr__(self) -> str:
+        colors = {c: k for c, k in self.color_sources.items() if k}
+        return f'ManaBase(deck_size={self.deck_size}, sources={self.sources}, color_sources={colors})'
+
+    @classmethod
+    def from_deck(cls, deck: pd.DataFrame, max_producer_mv: float = 2) -> 'ManaBase':
+        """
+        Mana base of a deck (one row per card, copies repeated): lands producing mana, plus the non-land
+        mana producers of mana value up to `max_producer_mv` (dorks, rocks), count as sources of their colors.
+        """
+        types = deck['types'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+        isLand = types.apply(lambda x: 'Land' in x).to_numpy()
+        producer = deck['text'].apply(producesMana).to_numpy()
+        manaValue = pd.to_numeric(deck['manaValue'], errors='coerce').fillna(0).to_numpy()
+        isSource = (isLand | producer) & ((isLand) | (manaValue <= max_producer_mv))
+        bits = producedColorBitmask(deck)[isSource]
+        mana_base = cls(len(deck), int(isSource.sum()), {c: int(((bits & COLOR_BIT[c]) > 0).sum()) for c in COLORS})
+        mana_base.source_bits = bits
+        return mana_base
+
+    def deck_bits(self) -> np.ndarray:
+        """
+        Color bitmask of each card of the deck (0 for non-sources), -1 marking the non-source cards.
+        """
+        if self.source_bits is not None:
+            bits = np.asarray(self.source_bits, dtype=np.int64)
+        else:
+            # Without the actual cards: mono-colored sources, the rest colorless
+            bits = np.concatenate([np.full(k, COLOR_BIT[c]) for c, k in self.color_sources.items()] + [np.zeros(0, dtype=np.int64)])
+            bits = np.concatenate([bits, np.zeros(max(0, self.sources - len(bits)), dtype=np.int64)])[:max(self.sources, len(bits))]
+        return np.concatenate([bits, np.full(self.deck_size - len(bits), -1)])
+
+def limited_mana_base(pips, deck_size: int = 40, lands: int = 17) -> ManaBase:
+    """
+    Typical limited mana base for a card of colors `pips` (counts per color of COLORS): the main color of a
+    two-color deck gets 9 sources, a second color 8 (7 / 6 / ... beyond, for splashes).
+    """
+    colors = [c for c, p in sorted(zip(COLORS, pips), key=lambda x: -x[1]) if p > 0]
+    split = [9, 8, 7, 6, 5]
+    return ManaBase(deck_size, lands, {c: split[i] for i, c in enumerate(colors)})
+
+def _requirements(cards: pd.DataFrame) -> pd.DataFrame:
+    pips = np.array([cost_pips(c) if isinstance(c, str) else (0,) * len(COLORS) for c in cards['manaCost']], dtype=np.int64)
+    manaValue = pd.to_numeric(cards['manaValue'], errors='coerce').fillna(0).to_numpy()
+    requirements = pd.DataFrame(pips, index=cards.index, columns=list(COLORS))
+    requirements['manaValue'] = np.ceil(manaValue).astype(np.int64)
+    requirements['turn'] = np.clip(requirements['manaValue'], 1, MAX_TURN)
+    return requirements
+
+def cards_seen(turn, on_play: bool = True):
+    return OPENING_HAND + turn - (1 if on_play else 0)
+
+def castability(
+        cards: pd.DataFrame,
+        mana_base: Optional[ManaBase] = None,
+        on_play: bool = True,
+        method: str = 'hypergeometric',
+        n_sim: int = 100_000,
+        seed=None
+        ) -> pd.DataFrame:
+    """
+    Probability of casting each card on curve (on the turn equal to its mana value, 1 for 0-cost cards).
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        Cards with 'manaCost' and 'manaValue' (a set as returned by `load_set`, or a deck).
+    mana_base : ManaBase, optional
+        Sources of the deck. If None, each card is evaluated in the typical limited deck of its colors
+        (`limited_mana_base`), only with the hypergeometric method.
+    method : str
+        'hypergeometric' or 'montecarlo' (needs `mana_base`).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Indexed like `cards`: 'turn', 'p_lands' (enough sources), 'p_colors' (enough sources of each color),
+        'p_castable' (both).
+    """
+    requirements = _requirements(cards)
+    keys = list(COLORS) + ['manaValue', 'turn']
+    unique = requirements.drop_duplicates(subset=keys).reset_index(drop=True)
+
+    if method == 'hypergeometric':
+        p_colors = np.ones(len(unique))
+        pips = unique[list(COLORS)].to_numpy()
+        bases = [mana_base if mana_base is not None else limited_mana_base(p) for p in pips]
+        N = np.array([b.deck_size for b in bases])
+        n = cards_seen(unique['turn'].to_numpy(), on_play)
+        p_lands = hypergeom_at_least(N, [b.sources for b in bases], n, unique['manaValue'].to_numpy())
+        for j, c in enumerate(COLORS):
+            needed = pips[:, j] > 0
+            if needed.any():
+                K = np.array([b.color_sources[c] for b in bases])
+                p_colors[needed] = p_colors[needed] * hypergeom_at_least(N[needed], K[needed], n[needed], pips[needed, j])
+        p_castable = p_lands * p_colors
+    elif method == 'montecarlo':
+        if mana_base is None:
+            raise ValueError("method='montecarlo' needs a mana_base")
+        p_lands, p_colors, p_castable = _montecarlo(unique, mana_base, on_play, n_sim, seed)
+    else:
+        raise ValueError("method must be 'hypergeometric' or 'montecarlo'")
+
+    unique['p_lands'], unique['p_colors'], unique['p_castable'] = p_lands, p_colors, p_castable
+    result = requirements.merge(unique, on=keys, how='left')
+    result.index = cards.index
+    return result[['turn', 'p_lands', 'p_colors', 'p_castable']]
+
+def _montecarlo(unique: pd.DataFrame, mana_base: ManaBase, on_play: bool, n_sim: int, seed, batch_size: int = 20_000):
+    # The same shuffled decks are used for all the requirements; sources seen are counted once per turn
+    rng = np.random.default_rng(seed)
+    bits = mana_base.deck_bits()
+    turns = unique['turn'].to_numpy()
+    pips = unique[list(COLORS)].to_numpy()
+    manaValue = unique['manaValue'].to_numpy()
+    hits = np.zeros((3, len(unique)))
+    done = 0
+    while done < n_sim:
+        m = min(batch_size, n_sim - done)
+        n_max = min(cards_seen(int(turns.max()), on_play), len(bits))
+        order = np.argsort(rng.random((m, len(bits))), axis=1)[:, :n_max]
+        seen = bits[order]
+        isSource = np.cumsum(seen >= 0, axis=1)
+        colorSources = np.stack([np.cumsum((seen >= 0) & (seen & COLOR_BIT[c] > 0), axis=1) for c in COLORS], axis=-1)
+        for t in np.unique(turns):
+            rows = np.flatnonzero(turns == t)
+            last = min(cards_seen(int(t), on_play), n_max) - 1
+            lands = isSource[:, last][:, None] >= manaValue[rows][None, :]
+            colors = (colorSources[:, last, None, :] >= pips[rows][None, :, :]).all(axis=-1)
+            hits[0, rows] += lands.sum(axis=0)
+            hits[1, rows] += colors.sum(axis=0)
+            hits[2, rows] += (lands & colors).sum(axis=0)
+        done += m
+    return hits / n_sim
+
+@dataclass(slots=True)
+class CastabilityMetrics(MetricsRecord):
+    meanCastability: float
+    castabilityByManaValue: dict
+    hardToCast: list
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('meanCastability', 'castabilityByManaValue', 'hardToCast')
+
+def analyzeSetCastability(cards, on_play=True):
+    """
+    Analyzes how easily the cards of a set are cast on curve, each in the typical limited deck of its colors.
+
+    Returns:
+    --------
+    CastabilityMetrics (unpacks as a tuple):
+        - `meanCastability` (float): mean probability of casting a card on curve, in percentage.
+        - `castabilityByManaValue` (dict): the same per mana value.
+        - `hardToCast` (list): names of the cards castable on curve less than half of the time.
+
+    Example:
+    --------
+    meanCastability, castabilityByManaValue, hardToCast = analyzeSetCastability(cards)
+    buffer = MetricsBuffer(len(sets), records=MetricsBuffer.RECORDS + (CastabilityMetrics,))
+    """
+    result = castability(cards, on_play=on_play)
+    meanCastability = result['p_castable'].mean() * 100
+    castabilityByManaValue = (result.groupby('turn')['p_castable'].mean() * 100).to_dict()
+    hardToCast = cards.loc[result['p_castable'] < 0.5, 'name'].tolist()
+    return CastabilityMetrics(meanCastability, castabilityByManaValue, hardToCast)
@@ -0,0 +1,242 @@
+# src/catalog.py
+# author: @taryaksama
+
+# Read-only binary catalog of all the printings, opened with mmap
+# A fresh process can slice one set without parsing JSON / Parquet
+#
+# File layout:
+#   MAGIC (8 bytes) | header length (uint64) | JSON header | sections aligned on 8 bytes
+# Sections:
+#   - fixed-width numeric columns (one value per card)
+#   - string columns: offsets (int64, n+1) + UTF-8 heap
+#   - list columns: offsets (int64, n+1) + vocabulary ids (int16) + missing flags
+#   - effect bitmask (uint32, one bit per rule of EFFECT_RULES + 'is_interaction')
+
+import json
+import mmap
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List
+
+from .card.parser import normalize_set_texts
+from .card.effects import effect_flags, EFFECT_RULES, RULES
+
+MAGIC = b'WBCAT002'
+ALIGN = 8
+
+NUMERIC_COLUMNS = {
+    'manaValue': 'float32',
+    'power': 'float32',
+    'toughness': 'float32',
+    'rarity': 'uint8',
+    'position': 'int32',        # row of the card in its set (index of load_set)
+    'base_set': 'bool',         # kept by load_set(restriction='base_set')
+}
+STRING_COLUMNS = ['name', 'manaCost', 'text', 'normalizedText', 'uuid', 'number']
+LIST_COLUMNS = ['keywords', 'types', 'supertypes', 'colorIdentity']
+RARITIES = ['common', 'uncommon', 'rare', 'mythic', 'special', 'bonus']
+BITMASK_RULES = EFFECT_RULES + ['is_interaction']
+
+def _encode_strings(values) -> tuple:
+    encoded = [v.encode('utf-8') if isinstance(v, str) else b'' for v in values]
+    missing = np.array([not isinstance(v, str) for v in values], dtype=bool)
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8), missing
+
+def _encode_lists(values, vocabulary: Dict[str, int]) -> tuple:
+    ids = []
+    lengths = np.zeros(len(values), dtype=np.int64)
+    missing = np.array([not isinstance(v, (list, tuple, np.ndarray)) for v in values], dtype=bool)
+    for i, v in enumerate(values):
+        if not missing[i]:
+            ids.extend(vocabulary.setdefault(x, len(vocabulary)) for x in v)
+            lengths[i] = len(v)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets, np.asarray(ids, dtype=np.int16), missing
+
+def write_catalog(allSets: pd.Series, path, set_codes: List[str] = None) -> Path:
+    """
+    Writes the binary catalog of the sets `set_codes` (default: all) of `allSets`
+    (the 'data' of AllPrintings.json, indexed by set code, as in main.ipynb).
+    """
+    from .utils import load_set, base_set_positions
+
+    frames, sets = [], {}
+    start = 0
+    for set_code in (allSets.index if set_codes is None else set_codes):
+        df = load_set(allSets, set_code, restriction='all').reset_index(drop=True)
+        df = df.reindex(columns=['name', 'keywords', 'manaValue', 'manaCost', 'colorIdentity', 'power', 'toughness',
+                                 'rarity', 'types', 'supertypes', 'text', 'uuid', 'number', 'normalizedText'])
+        df['position'] = np.arange(len(df))
+        # Same base set as load_set(restriction='base_set'), computed on the same frame
+        base = base_set_positions(df['name'].tolist(), df['text'].tolist(), allSets.loc[set_code].get('baseSetSize'))
+        df['base_set'] = df['position'].isin(base)
+        df['set_code'] = set_code
+        frames.append(df)
+        sets[set_code] = [start, start + len(df)]
+        start += len(df)
+    cards = pd.concat(frames, ignore_index=True)
+
+    cards[['manaValue', 'power', 'toughness']] = cards[['manaValue', 'power', 'toughness']].apply(pd.to_numeric, errors='coerce')
+    rarity_codes = {r: i for i, r in enumerate(RARITIES)}
+    cards['rarity'] = cards['rarity'].map(lambda r: rarity_codes.setdefault(r, len(rarity_codes)))
+    if cards['normalizedText'].isna().any():
+        cards['normalizedText'] = normalize_set_texts(cards)
+
+    flags = effect_flags(cards['normalizedText'], rules=BITMASK_RULES).to_numpy()
+    bitmask = (flags.astype(np.uint32) << np.arange(len(BITMASK_RULES), dtype=np.uint32)).sum(axis=1).astype(np.uint32)
+
+    arrays, header = [], {'n': len(cards), 'sets': sets, 'columns': {}, 'rarities': list(rarity_codes), 'bitmask_rules': BITMASK_RULES}
+    def add(name, array):
+        header['columns'][name] = {'dtype': array.dtype.str, 'length': len(array)}
+        arrays.append((name, np.ascontiguousarray(array)))
+
+    for column, dtype in NUMERIC_COLUMNS.items():
+        add(column, cards[column].to_numpy(dtype))
+    for column in STRING_COLUMNS:
+        offsets, heap, missing = _encode_strings(cards[column].tolist())
+        add(f'{column}.offsets', offsets)
+        add(f'{column}.heap', heap)
+        add(f'{column}.missing', missing)
+    vocabularies = {}
+    for column in LIST_COLUMNS:
+        vocabulary = {}
+        offsets, ids, missing = _encode_lists(cards[column].tolist(), vocabulary)
+        vocabularies[column] = list(vocabulary)
+        add(f'{column}.offsets', offsets)
+        add(f'{column}.ids', ids)
+        add(f'{column}.missing', missing)
+    add('effects', bitmask)
+    header['vocabularies'] = vocabularies
+
+    # Offsets of the sections, relative to the end of the header
+    position = 0
+    for name, array in arrays:
+        header['columns'][name]['offset'] = position
+        position += -(-array.nbytes // ALIGN) * ALIGN
+
+    path = Path(path)
+    raw_header = json.dumps(header).encode('utf-8')
+    raw_header += b' ' * (-(len(MAGIC) + 8 + len(raw_header)) % ALIGN)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(raw_header)).tobytes())
+        f.write(raw_header)
+        for _, array in arrays:
+            data = array.tobytes()
+            f.write(data)
+            f.write(b'\0' * (-len(data) % ALIGN))
+    return path
+
+class Catalog():
+    """
+    Read-only view of a catalog written by `write_catalog`. Columns are numpy views on the mmap,
+    nothing is decoded until a set is sliced.
+
+    Example:
+    --------
+    catalog = Catalog('data/AllPrintings.wbcat')
+    cards = load_set(catalog, 'OTJ', restriction='limited')   # same frame as load_set(allSets, ...)
+    flags = catalog.effect_flags('OTJ')
+    """
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self.path} is not a wizard-baguette catalog')
+        header_length = int(np.frombuffer(self._mmap, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[start:start + header_length])
+        self._base = start + header_length
+        self.sets = {k: tuple(v) for k, v in self.header['sets'].items()}
+        self.rarities = np.array(self.header['rarities'], dtype=object)
+        self.vocabularies = {k: np.array(v, dtype=object) for k, v in self.header['vocabularies'].items()}
+
+    def __len__(self) -> int:
+        return self.header['n']
+
+    def __contains__(self, set_code: str) -> bool:
+        return set_code in self.sets
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'Catalog':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def array(self, name: str) -> np.ndarray:
+        meta = self.header['columns'][name]
+        return np.frombuffer(self._mmap, dtype=np.dtype(meta['dtype']), count=meta['length'], offset=self._base + meta['offset'])
+
+    def _strings(self, column: str, rows: np.ndarray) -> list:
+        offsets = self.array(f'{column}.offsets')
+        missing = self.array(f'{column}.missing')
+        meta = self.header['columns'][f'{column}.heap']
+        base = self._base + meta['offset']
+        mm = self._mmap
+        return [
+            None if missing[i] else mm[base + offsets[i]:base + offsets[i + 1]].decode('utf-8')
+            for i in rows
+        ]
+
+    def _lists(self, column: str, rows: np.ndarray) -> list:
+        offsets = self.array(f'{column}.offsets')
+        ids = self.array(f'{column}.ids')
+        missing = self.array(f'{column}.missing')
+        vocabulary = self.vocabularies[column]
+        return [np.nan if missing[i] else list(vocabulary[ids[offsets[i]:offsets[i + 1]]]) for i in rows]
+
+    def rows(self, set_code: str, restriction: str = 'all', rarities=('common', 'uncommon')) -> np.ndarray:
+        start, stop = self.sets[set_code]
+        rows = np.arange(start, stop)
+        if restriction in ('base_set', 'limited'):
+            rows = rows[self.array('base_set')[start:stop]]
+        if restriction == 'limited':
+            rarity = self.rarities[self.array('rarity')[rows]]
+            rows = rows[np.isin(rarity, list(rarities))]
+        return rows
+
+    def load_set(self, set_code: str, restriction: str = 'all', rarities=('common', 'uncommon')) -> pd.DataFrame:
+        """
+        Decodes only the rows of `set_code`. With restriction 'base_set' or 'limited', the frame is the same as
+        `utils.load_set(allSets, ...)` (columns, dtypes, index). With 'all', utils returns every raw MTGJSON column,
+        while the catalog only has the same stored columns, 'power' / 'toughness' numeric (NaN kept).
+        """
+        rows = self.rows(set_code, restriction, rarities)
+        cards = pd.DataFrame({
+            'name': self._strings('name', rows),
+            'keywords': self._lists('keywords', rows),
+            'manaValue': self.array('manaValue')[rows].astype(float),
+            'manaCost': self._strings('manaCost', rows),
+            'colorIdentity': self._lists('colorIdentity', rows),
+            'power': self.array('power')[rows].astype(float),
+            'toughness': self.array('toughness')[rows].astype(float),
+            'rarity': self.rarities[self.array('rarity')[rows]],
+            'types': self._lists('types', rows),
+            'supertypes': self._lists('supertypes', rows),
+            'text': self._strings('text', rows),
+            'uuid': self._strings('uuid', rows),
+        }, index=pd.Index(self.array('position')[rows].astype(np.int64), name=None))
+        if restriction in ('base_set', 'limited'):
+            cards[['manaValue', 'power', 'toughness']] = cards[['manaValue', 'power', 'toughness']].fillna(0)
+        cards['normalizedText'] = pd.Series(self._strings('normalizedText', rows), index=cards.index, dtype=object)
+        return cards
+
+    def effect_flags(self, set_code: str, restriction: str = 'all', rarities=('common', 'uncommon')) -> pd.DataFrame:
+        """
+        Precomputed Effects flags (BITMASK_RULES) of a set, from the stored bitmask.
+        """
+        rows = self.rows(set_code, restriction, rarities)
+        bits = self.array('effects')[rows]
+        rules = self.header['bitmask_rules']
+        flags = (bits[:, None] >> np.arange(len(rules), dtype=np.uint32)) & 1
+        return pd.DataFrame(flags.astype(bool), index=self.array('position')[rows], columns=rules)
@@ -0,0 +1,170 @@
+# src/combat.py
+# author: @taryaksama
+
+# Combat math between the creatures of a set: for every attacker x blocker pair, who dies and who survives
+# All the pairs are evaluated at once with broadcasted matrices (attackers on rows, blockers on columns)
+# Keywords taken into account: Flying, Reach, Menace (cannot be blocked by one creature), First strike,
+# Double strike, Deathtouch, Indestructible; other abilities are ignored
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import ClassVar, Tuple
+
+from .set_analyzer import MetricsRecord
+
+COMBAT_KEYWORDS = ['Flying', 'Reach', 'Menace', 'First strike', 'Double strike', 'Deathtouch', 'Indestructible']
+
+def combatProfile(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Creatures of `cards` with their power, toughness and one boolean column per keyword of COMBAT_KEYWORDS.
+    """
+    types = cards['types'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+    creatures = cards[types.apply(lambda x: 'Creature' in x).to_numpy()]
+    keywords = creatures['keywords'].apply(lambda x: set(x) if isinstance(x, (list, tuple, np.ndarray)) else set())
+    profile = pd.DataFrame({
+        'name': creatures['name'],
+        'manaValue': pd.to_numeric(creatures['manaValue'], errors='coerce').fillna(0),
+        'power': pd.to_numeric(creatures['power'], errors='coerce').fillna(0).clip(lower=0),
+        'toughness': pd.to_numeric(creatures['toughness'], errors='coerce').fillna(0),
+    }, index=creatures.index)
+    for kw in COMBAT_KEYWORDS:
+        profile[kw] = keywords.apply(lambda x: kw in x).to_numpy()
+    return profile
+
+def combatMatrices(profile: pd.DataFrame) -> dict:
+    """
+    Outcome of every single-block combat, attacker i (rows) blocked by blocker j (columns).
+
+    Returns:
+    --------
+    dict of (n, n) boolean numpy arrays:
+        - 'canBlock': j can block i (flying needs flying or reach, menace needs two blockers)
+        - 'attackerDies', 'blockerDies': outcome when j blocks i (False where j cannot block)
+    """
+    p = profile['power'].to_numpy(float)
+    t = profile['toughness'].to_numpy(float)
+    kw = {k: profile[k].to_numpy() for k in COMBAT_KEYWORDS}
+
+    A = lambda v: v[:, None] # attacker values on rows
+    B = lambda v: v[None, :] # blocker values on columns
+
+    canBlock = ~(A(kw['Flying']) & ~(B(kw['Flying']) | B(kw['Reach']))) & ~A(kw['Menace'])
+
+    def lethal(power, deathtouch, toughness, indestructible):
+        return ((power >= toughness) | (deathtouch & (power > 0))) & ~indestructible
+
+    aFirst = A(kw['First strike'] | kw['Double strike'])
+    bFirst = B(kw['First strike'] | kw['Double strike'])
+    aRegular = A(~kw['First strike'] | kw['Double strike'])
+    bRegular = B(~kw['First strike'] | kw['Double strike'])
+    aPower, bPower = A(p), B(p)
+    aDouble, bDouble = A(kw['Double strike']), B(kw['Double strike'])
+
+    # First strike damage step
+    blockerDiesFirst = aFirst & lethal(aPower, A(kw['Deathtouch']), B(t), B(kw['Indestructible']))
+    attackerDiesFirst = bFirst & lethal(bPower, B(kw['Deathtouch']), A(t), A(kw['Indestructible']))
+    # Regular damage step: only creatures still alive deal damage; double strikers add their damage again
+    aTotal = aPower * (1 + aDouble)
+    bTotal = bPower * (1 + bDouble)
+    blockerDiesRegular = aRegular & ~attackerDiesFirst & lethal(np.where(aFirst, aTotal, aPower), A(kw['Deathtouch']), B(t), B(kw['Indestructible']))
+    attackerDiesRegular = bRegular & ~blockerDiesFirst & lethal(np.where(bFirst, bTotal, bPower), B(kw['Deathtouch']), A(t), A(kw['Indestructible']))
+
+    return {
+        'canBlock': canBlock,
+        'attackerDies': canBlock & (attackerDiesFirst | attackerDiesRegular),
+        'blockerDies': canBlock & (blockerDiesFirst | blockerDiesRegular),
+    }
+
+def tradeValues(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combat value of each creature of `cards` against all the creatures of `cards` (itself included).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Indexed like the creatures of `cards`, in percentage of the opposing creatures:
+        - 'unblockable': attacks without any of them being able to block it
+        - 'attackWins' / 'attackTrades' / 'attackLoses': blocked by one of them, kills it and survives / both die / dies alone
+        - 'blockWins' / 'blockTrades' / 'blockLoses': the same when blocking them (among the ones it can block)
+        - 'tradeValue': wins minus losses over both roles, in percentage of the combats
+        - 'tradeUpRate': trades and wins against creatures of higher mana value, in percentage of the combats
+    """
+    profile = combatProfile(cards)
+    m = combatMatrices(profile)
+    canBlock, aDies, bDies = m['canBlock'], m['attackerDies'], m['blockerDies']
+    n = len(profile)
+    blockedBy = canBlock.sum(axis=0) # attackers each blocker can block
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = pd.DataFrame({
+            'name': profile['name'],
+            'unblockable': (~canBlock).all(axis=1) * 100.0,
+            'attackWins': (bDies & ~aDies).sum(axis=1) / n * 100,
+            'attackTrades': (bDies & aDies).sum(axis=1) / n * 100,
+            'attackLoses': (aDies & ~bDies).sum(axis=1) / n * 100,
+            'blockWins': (aDies & ~bDies).sum(axis=0) / blockedBy * 100,
+            'blockTrades': (aDies & bDies).sum(axis=0) / blockedBy * 100,
+            'blockLoses': (bDies & ~aDies).sum(axis=0) / blockedBy * 100,
+        }, index=profile.index)
+
+        # Both roles: as attacker (rows) and as blocker (columns, transposed)
+        wins = (bDies & ~aDies).sum(axis=1) + (aDies & ~bDies).sum(axis=0)
+        losses = (aDies & ~bDies).sum(axis=1) + (bDies & ~aDies).sum(axis=0)
+        combats = canBlock.sum(axis=1) + blockedBy
+        result['tradeValue'] = (wins - losses) / combats * 100
+
+        mv = profile['manaValue'].to_numpy()
+        higher = mv[None, :] > mv[:, None] # opponent j costs more than i
+        up = ((bDies & higher).sum(axis=1) + (aDies & higher.T).sum(axis=0))
+        result['tradeUpRate'] = up / combats * 100
+    return result
+
+@dataclass(slots=True)
+class CombatMetrics(MetricsRecord):
+    attackerAdvantage: float
+    tradeRate: float
+    unblockableRatio: float
+    meanTradeValue: float
+    bestTraders: list
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('attackerAdvantage', 'tradeRate', 'unblockableRatio', 'meanTradeValue', 'bestTraders')
+
+def analyzeSetCombat(cards, rarities=('common',)):
+    """
+    Analyzes how the creatures of a set trade in combat (by default commons against commons).
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        A DataFrame of cards, as returned by `load_set`.
+    rarities : tuple of str or None
+        Rarities of the creatures compared (None for all).
+
+    Returns:
+    --------
+    CombatMetrics (unpacks as a tuple):
+        - `attackerAdvantage` (float): percentage of blocks where the attacker survives.
+        - `tradeRate` (float): percentage of blocks where both creatures die.
+        - `unblockableRatio` (float): percentage of attacker / blocker pairs where the blocker cannot block.
+        - `meanTradeValue` (float): mean `tradeValue` of the creatures.
+        - `bestTraders` (list): names of the 5 creatures with the highest `tradeValue`.
+
+    Example:
+    --------
+    attackerAdvantage, tradeRate, unblockableRatio, meanTradeValue, bestTraders = analyzeSetCombat(cards)
+    buffer = MetricsBuffer(len(sets), records=MetricsBuffer.RECORDS + (CombatMetrics,))
+    """
+    if rarities is not None:
+        cards = cards[cards['rarity'].isin(list(rarities))]
+    profile = combatProfile(cards)
+    m = combatMatrices(profile)
+    blocks = m['canBlock'].sum()
+
+    attackerAdvantage = (m['canBlock'] & ~m['attackerDies']).sum() / blocks * 100 if blocks else np.nan
+    tradeRate = (m['attackerDies'] & m['blockerDies']).sum() / blocks * 100 if blocks else np.nan
+    unblockableRatio = (~m['canBlock']).mean() * 100 if len(profile) else np.nan
+
+    values = tradeValues(cards)
+    meanTradeValue = values['tradeValue'].mean()
+    bestTraders = values.sort_values('tradeValue', ascending=False)['name'].head(5).tolist()
+    return CombatMetrics(attackerAdvantage, tradeRate, unblockableRatio, meanTradeValue, bestTraders)
@@ -1 +1,199 @@
-# src/deck_analyzer.py
\ No newline at end of file
+# src/deck_analyzer.py
+# author: @taryaksama
+
+# Synergy analysis from decklists / game logs: how often two cards of a set are played together (and win together)
+# Cards are integer ids (their position in the loaded set), the card x card counts are kept as a sorted CSR
+# structure in numpy (row-major keys `i * n + j`), merged with each new batch of decks
+# scipy is optional: only needed to export a scipy.sparse matrix
+
+import numpy as np
+import pandas as pd
+from typing import Iterable, Optional, Sequence
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+DENSE_PAIRS = 1 << 24 # batches are reduced with a dense bincount when there are at most that many (i, j) keys
+
+class CooccurrenceMatrix():
+    """
+    Card x card co-occurrence counts over decks, updated batch by batch.
+
+    A card counts once per deck (copies are ignored). Both directions of each pair are stored, so the partners
+    of a card are a contiguous slice of the structure. With game results, the decks that won are counted apart.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame or sequence of str
+        The loaded set (its 'name' column) or the card names; card ids are positions in it.
+
+    Example:
+    --------
+    cooc = CooccurrenceMatrix(load_set(allSets, 'OTJ', restriction='limited'))
+    cooc.update(decks, wins=wins)     # decks: lists of card names (or of card ids)
+    cooc.update_long(games, deck='game_id', card='name', win='won')
+    cooc.top_k('Bounding Felidar', k=10, by='lift')
+    """
+
+    def __init__(self, cards, batch_size: int = 2_000) -> None:
+        names = cards['name'] if isinstance(cards, pd.DataFrame) else cards
+        self.names = np.asarray(list(names), dtype=object)
+        self.card_ids = {}
+        for i, name in enumerate(self.names):
+            self.card_ids.setdefault(name, i) # reprints keep the first id
+        self.n = len(self.names)
+        self.batch_size = batch_size
+
+        self.n_decks = 0
+        self.n_wins = 0
+        self.card_counts = np.zeros(self.n, dtype=np.int64)
+        self.card_wins = np.zeros(self.n, dtype=np.int64)
+        self._keys = np.zeros(0, dtype=np.int64)   # sorted i * n + j, i != j
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._wins = np.zeros(0, dtype=np.int64)
+
+    def __repr__(self) -> str:
+        return f'CooccurrenceMatrix(cards={self.n}, decks={self.n_decks}, pairs={len(self._keys) // 2})'
+
+    def encode(self, deck: Sequence) -> np.ndarray:
+        """
+        Card ids of a deck given as card names (unknown names dropped) or already as ids.
+        """
+        if isinstance(deck, np.ndarray) and deck.dtype.kind in 'iu':
+            return deck.astype(np.int64)
+        ids = [self.card_ids.get(c, -1) if isinstance(c, str) else int(c) for c in deck]
+        return np.asarray([i for i in ids if 0 <= i < self.n], dtype=np.int64)
+
+    def update(self, decks: Iterable[Sequence], wins: Optional[Sequence[bool]] = None) -> 'CooccurrenceMatrix':
+        """
+        Adds a batch of decks (card names or ids); `wins` flags the decks that won, if known.
+        """
+        decks = [self.encode(d) for d in decks]
+        wins = np.zeros(len(decks), dtype=bool) if wins is None else np.asarray(wins, dtype=bool)
+        if len(wins) != len(decks):
+            raise ValueError('wins must have one value per deck')
+        for start in range(0, len(decks), self.batch_size):
+            self._add(decks[start:start + self.batch_size], wins[start:start + self.batch_size])
+        return self
+
+    def update_long(self, frame: pd.DataFrame, deck: str = 'deck_id', card: str = 'name', win: Optional[str] = None) -> 'CooccurrenceMatrix':
+        """
+        Adds decks given in long format: one row per card of a deck (ie. a game log), `deck` identifying the deck,
+        `card` the card name and `win` (optional) whether the deck won.
+        """
+        ids = frame[card].map(self.card_ids)
+        frame = frame.loc[ids.notna()].assign(_id=ids.dropna().astype(np.int64)).sort_values(deck, kind='stable')
+        _, starts = np.unique(frame[deck].to_numpy(), return_index=True)
+        decks = np.split(frame['_id'].to_numpy(), starts[1:])
+        wins = frame[win].to_numpy(dtype=bool)[starts] if win is not None else None
+        return self.update(decks, wins)
+
+    def _add(self, decks: list, wins: np.ndarray) -> None:
+        if not decks:
+            return
+        # Padded (decks, width) array of ids, sorted per deck with copies blanked out (-1)
+        width = max(len(d) for d in decks)
+        ids = np.full((len(decks), max(width, 1)), -1, dtype=np.int64)
+        for r, d in enumerate(decks):
+            ids[r, :len(d)] = d
+        ids.sort(axis=1)
+        ids[:, 1:][ids[:, 1:] == ids[:, :-1]] = -1
+        present = ids >= 0
+
+        self.n_decks += len(decks)
+        self.n_wins += int(wins.sum())
+        self.card_counts += np.bincount(ids[present], minlength=self.n)
+        self.card_wins += np.bincount(ids[present & wins[:, None]], minlength=self.n)
+
+        # Pairs i < j of each deck (ids are sorted), reduced over the batch, then stored in both directions
+        a, b = np.triu_indices(ids.shape[1], 1)
+        i, j = ids[:, a], ids[:, b]
+        valid = (i >= 0) & (j >= 0)
+        keys = (i * self.n + j)[valid]
+        wonKeys = (i * self.n + j)[valid & wins[:, None]]
+        if self.n * self.n <= DENSE_PAIRS:
+            counts = np.bincount(keys, minlength=self.n * self.n)
+            keys = np.flatnonzero(counts)
+            counts, won = counts[keys], np.bincount(wonKeys, minlength=self.n * self.n)[keys]
+        else:
+            keys, counts = np.unique(keys, return_counts=True)
+            wonKeys, wonCounts = np.unique(wonKeys, return_counts=True)
+            won = np.zeros(len(keys), dtype=np.int64)
+            won[np.searchsorted(keys, wonKeys)] = wonCounts
+        i, j = np.divmod(keys, self.n)
+        self._merge(np.concatenate([keys, j * self.n + i]), np.concatenate([counts, counts]), np.concatenate([won, won]))
+
+    def _merge(self, keys: np.ndarray, counts: np.ndarray, wins: np.ndarray) -> None:
+        # Both key arrays are unique: the batch is sorted, then matched against the stored keys with a
+        # binary search; counts are added in place and the new keys inserted at their sorted position
+        order = np.argsort(keys, kind='stable')
+        keys, counts, wins = keys[order], counts[order], wins[order]
+        pos = np.searchsorted(self._keys, keys)
+        found = pos < len(self._keys)
+        found[found] = self._keys[pos[found]] == keys[found]
+        self._counts[pos[found]] += counts[found]
+        self._wins[pos[found]] += wins[found]
+        new = ~found
+        self._keys = np.insert(self._keys, pos[new], keys[new])
+        self._counts = np.insert(self._counts, pos[new], counts[new])
+        self._wins = np.insert(self._wins, pos[new], wins[new])
+
+    def to_csr(self, wins: bool = False) -> tuple:
+        """
+        (indptr, indices, data) of the (n, n) co-occurrence matrix (or of the win co-occurrence matrix),
+        the diagonal holding the number of decks (won) of each card.
+        """
+        rows, cols = np.divmod(self._keys, self.n)
+        data = self._wins if wins else self._counts
+        diagonal = self.card_wins if wins else self.card_counts
+        # Insert the diagonal at its place in each row
+        keys = np.concatenate([self._keys, np.arange(self.n) * (self.n + 1)])
+        order = np.argsort(keys, kind='stable')
+        indices = np.concatenate([cols, np.arange(self.n)])[order]
+        values = np.concatenate([data, diagonal])[order]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=self.n) + 1)])
+        return indptr, indices, values
+
+    def to_sparse(self, wins: bool = False):
+        """
+        The co-occurrence matrix as a scipy.sparse.csr_matrix (needs scipy).
+        """
+        if sparse is None:
+            raise ImportError('to_sparse needs scipy; use to_csr for the numpy arrays')
+        indptr, indices, data = self.to_csr(wins)
+        return sparse.csr_matrix((data, indices, indptr), shape=(self.n, self.n))
+
+    def partners(self, card) -> pd.DataFrame:
+        """
+        All the cards played with `card` (name or id): 'count' (decks with both), 'wins' (won decks with both),
+        'lift' (count relative to independence), 'win_rate' (wins / count).
+        """
+        i = self.card_ids[card] if isinstance(card, str) else int(card)
+        lo, hi = np.searchsorted(self._keys, [i * self.n, (i + 1) * self.n])
+        j = self._keys[lo:hi] - i * self.n
+        count, wins = self._counts[lo:hi], self._wins[lo:hi]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lift = count * self.n_decks / (self.card_counts[i] * self.card_counts[j])
+        return pd.DataFrame({
+            'id': j,
+            'name': self.names[j],
+            'count': count,
+            'wins': wins,
+            'lift': lift,
+            'win_rate': wins / count,
+        })
+
+    def top_k(self, card, k: int = 10, by: str = 'count', min_count: int = 1) -> pd.DataFrame:
+        """
+        The `k` best partners of `card` by 'count', 'lift' or 'win_rate', among the pairs seen at least `min_count` times.
+        """
+        if by not in ('count', 'lift', 'win_rate'):
+            raise ValueError("by must be 'count', 'lift' or 'win_rate'")
+        partners = self.partners(card)
+        partners = partners[partners['count'] >= min_count]
+        if len(partners) > k:
+            keep = np.argpartition(-partners[by].to_numpy(), k - 1)[:k]
+            partners = partners.iloc[keep]
+        return partners.sort_values([by, 'count'], ascending=False).reset_index(drop=True)
@@ -0,0 +1,250 @@
+# src/feature_store.py
+# author: @taryaksama
+
+# On-disk store of the derived per-card features, keyed by the MTGJSON `uuid`
+# Each feature (a group of columns) is saved in compressed columnar chunks (.npz) and tagged with a version:
+# changing one rule only recomputes the features whose version changed
+
+import json
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from . import card_analyzer
+from .card_analyzer import pipMatrix, isMultiPip, producesMana
+from .card import body, manaprod, mana, parser, rules
+from .card import __config__ as card_config
+from .card.effects import RULES, EFFECT_RULES
+from .card.body import classify_bodies
+from .card.manaprod import mana_production_matrix
+
+MANIFEST = 'manifest.json'
+
+def source_version(*modules) -> str:
+    # Version of the code computing a feature: hash of the source of the modules it depends on
+    h = hashlib.sha1()
+    for module in modules:
+        try:
+            h.update(inspect.getsource(module).encode('utf-8'))
+        except (OSError, TypeError):
+            h.update(module.__name__.encode('utf-8'))
+    return h.hexdigest()[:12]
+
+def rule_version(rule_name: str) -> str:
+    # Version of a rule of the Effects registry: hash of its resolved definition (the rule and all the rules
+    # it depends on, so editing an operand of a combinator changes it), and of the parser and rule engine
+    definitions = '\n'.join(f'{n}={RULES.rules[n]!r}' for n in RULES.compile([rule_name]))
+    return hashlib.sha1((definitions + source_version(parser, rules)).encode('utf-8')).hexdigest()[:12]
+
+def fixing_flags(cards: pd.DataFrame) -> pd.DataFrame:
+    # 'isMultiPip' and 'producesMana' flags used by analyzeSetFixing
+    return pd.DataFrame({
+        'isMultiPip': cards['manaCost'].apply(isMultiPip),
+        'producesMana': cards['text'].apply(producesMana),
+    }, index=cards.index)
+
+class Feature():
+    def __init__(self, name: str, compute: Callable[[pd.DataFrame], pd.DataFrame], version: str) -> None:
+        self.name = name
+        self.compute = compute
+        self.version = version
+
+class FeatureStore():
+    """
+    Persists derived per-card features so they are computed once across sessions.
+
+    Default features:
+    - 'effect:<rule>' for each rule of EFFECT_RULES (+ 'is_interaction'), versioned by the rule definition
+      (and its dependencies); the other features are versioned by the source of the code computing them
+    - 'bodies': columns of `classify_bodies`
+    - 'manaprod': mana production matrix (`mana_production_matrix`)
+    - 'pips': colored pips per color (`pipMatrix`)
+    - 'fixing': 'isMultiPip' and 'producesMana' flags used by analyzeSetFixing
+
+    Example:
+    --------
+    store = FeatureStore('data/features')
+    store.update(cards)                              # computes what is missing or outdated, appends a chunk
+    bodies = store.get(cards, 'bodies')              # aligned on cards.index
+    analyzeSetSpeed(cards, store=store)
+    """
+
+    BODY_VERSION = source_version(body, parser, card_config)
+    MANAPROD_VERSION = source_version(manaprod, mana, card_config)
+    PIPS_VERSION = source_version(card_analyzer, mana)
+    FIXING_VERSION = source_version(card_analyzer, mana)
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.features: Dict[str, Feature] = {}
+        self._loaded: Dict[str, pd.DataFrame] = {}
+        manifest = self.path / MANIFEST
+        self.manifest = json.loads(manifest.read_text()) if manifest.exists() else {}
+
+        for rule in EFFECT_RULES + ['is_interaction']:
+            self.register(f'effect:{rule}', lambda cards, rule=rule: RULES.evaluate(cards, [rule]), rule_version(rule))
+        self.register('bodies', classify_bodies, self.BODY_VERSION)
+        self.register('manaprod', mana_production_matrix, self.MANAPROD_VERSION)
+        self.register('pips', pipMatrix, self.PIPS_VERSION)
+        self.register('fixing', fixing_flags, self.FIXING_VERSION)
+
+    def register(self, name: str, compute: Callable[[pd.DataFrame], pd.DataFrame], version: str) -> None:
+        """
+        Registers a feature. If a stored feature has another version, its chunks are dropped.
+        """
+        self.features[name] = Feature(name, compute, str(version))
+        stored = self.manifest.get(name)
+        if stored is not None and stored['version'] != str(version):
+            for chunk in stored['chunks']:
+                (self.path / chunk['file']).unlink(missing_ok=True)
+            del self.manifest[name]
+            self._loaded.pop(name, None)
+            self._save_manifest()
+
+    def _save_manifest(self) -> None:
+        tmp = self.path / (MANIFEST + '.tmp')
+        tmp.write_text(json.dumps(self.manifest, indent=1))
+        tmp.replace(self.path / MANIFEST)
+
+    def _load(self, name: str) -> pd.DataFrame:
+        # All the chunks of a feature, indexed by uuid (last write wins)
+        if name not in self._loaded:
+            frames = []
+            for chunk in self.manifest.get(name, {}).get('chunks', []):
+                with np.load(self.path / chunk['file'], allow_pickle=False) as data:
+                    columns = chunk['columns']
+                    frame = pd.DataFrame({c: data[f'c{i}'] for i, c in enumerate(columns)}, index=data['uuid'])
+                    for c in chunk.get('nullable', []):
+                        frame[c] = frame[c].where(frame[c] != '', None)
+                    frames.append(frame)
+            frame = pd.concat(frames) if frames else pd.DataFrame()
+            self._loaded[name] = frame[~frame.index.duplicated(keep='last')]
+        return self._loaded[name]
+
+    def stored_uuids(self, name: str) -> pd.Index:
+        return self._load(name).index
+
+    def update(self, cards: pd.DataFrame, features: List[str] = None) -> Dict[str, int]:
+        """
+        Computes and appends the features of the cards of `cards` (column 'uuid') not stored yet.
+
+        Returns:
+        --------
+        dict
+            Number of cards computed per feature.
+        """
+        computed = {}
+        for name in (self.features if features is None else features):
+            feature = self.features[name]
+            todo = cards[~cards['uuid'].isin(self.stored_uuids(name))].drop_duplicates(subset='uuid')
+            computed[name] = len(todo)
+            if todo.empty:
+                continue
+            values = feature.compute(todo)
+            chunk_id = len(self.manifest.get(name, {}).get('chunks', []))
+            file = f"{name.replace(':', '__')}.{chunk_id:05d}.npz"
+
+            arrays, nullable = {'uuid': todo['uuid'].to_numpy(dtype=str)}, []
+            for i, column in enumerate(values.columns):
+                v = values[column]
+                if v.dtype == object or pd.api.types.is_string_dtype(v):
+                    nullable.append(column)
+                    arrays[f'c{i}'] = v.fillna('').astype(str).to_numpy(dtype=str)
+                else:
+                    arrays[f'c{i}'] = v.to_numpy()
+            np.savez_compressed(self.path / file, **arrays)
+
+            entry = self.manifest.setdefault(name, {'version': feature.version, 'chunks': []})
+            entry['chunks'].append({'file': file, 'n': len(todo), 'columns': list(values.columns), 'nullable': nullable})
+            self._loaded.pop(name, None)
+            self._save_manifest()
+        return computed
+
+    def get(self, cards: pd.DataFrame, names, update: bool = True) -> pd.DataFrame:
+        """
+        Features `names` (a name or a list of names) of `cards`, aligned on `cards.index`.
+        Missing features are computed and stored first if `update` is True.
+        """
+        names = [names] if isinstance(names, str) else list(names)
+        if update:
+            self.update(cards, names)
+        frames = [self._load(n).reindex(cards['uuid'].to_numpy()) for n in names]
+        result = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+        result.index = cards.index
+        return result
+
+    def get_flags(self, cards: pd.DataFrame, names, update: bool = True) -> pd.DataFrame:
+        """
+        Boolean features `names` of `cards`, as `get`; raises a KeyError if some cards have no stored value
+        (a missing value must not be read as True).
+        """
+        result = self.get(cards, names, update=update)
+        missing = result.isna().any(axis=1)
+        if missing.any():
+            raise KeyError(f'{int(missing.sum())} cards have no stored value for {names} (ie. missing uuid)')
+        return result.astype(bool)
+
+    def card_feature(self, uuid: str, name: str) -> Optional[pd.Series]:
+        """
+        Stored values of feature `name` for one card, or None if the card is not stored (nothing is computed).
+        """
+        frame = self._load(name)
+        if uuid not in frame.index:
+            return None
+        return frame.loc[uuid]
+
+    def card_effects(self, uuid: str) -> Dict[str, np.ndarray]:
+        """
+        Stored Effects flags of one card, in the format of the cache of `Effects` (empty if the card is not stored).
+        """
+        results = {}
+        for name in self.features:
+            if name.startswith('effect:'):
+                frame = self._load(name)
+                if uuid in frame.index:
+                    results[name[len('effect:'):]] = np.array([bool(frame.at[uuid, name[len('effect:'):]])])
+        return results
+
+    def effect_flags(self, cards: pd.DataFrame, rules: List[str] = None, update: bool = True) -> pd.DataFrame:
+        """
+        Precomputed Effects flags of `cards` (same columns as `effect_flags`).
+        """
+        rules = EFFECT_RULES if rules is None else rules
+        return self.get_flags(cards, [f'effect:{r}' for r in rules], update=update)
+
+class SetFeatures():
+    """
+    Features of one set already computed in memory (ie. by the classify stage of the pipeline), read by the
+    analyzers through the same `get` / `get_flags` interface as a FeatureStore (`store=` argument).
+
+    Parameters:
+    -----------
+    features : dict of pandas.DataFrame
+        Feature name ('bodies', 'fixing', ...) -> its columns, indexed like the cards of the set.
+
+    Example:
+    --------
+    features = SetFeatures({'bodies': classify_bodies(cards), 'fixing': fixing_flags(cards)})
+    analyzeSetMetrics(cards, store=features, bodies=True)
+    """
+
+    def __init__(self, features: Dict[str, pd.DataFrame]) -> None:
+        self.features = features
+
+    def get(self, cards: pd.DataFrame, names, update: bool = True) -> pd.DataFrame:
+        names = [names] if isinstance(names, str) else list(names)
+        missing = [n for n in names if n not in self.features]
+        if missing:
+            raise KeyError(f'Features not computed: {missing}')
+        return pd.concat([self.features[n].reindex(cards.index) for n in names], axis=1)
+
+    def get_flags(self, cards: pd.DataFrame, names, update: bool = True) -> pd.DataFrame:
+        result = self.get(cards, names)
+        missing = result.isna().any(axis=1)
+        if missing.any():
+            raise KeyError(f'{int(missing.sum())} cards have no computed value for {names}')
+        return result.astype(bool)
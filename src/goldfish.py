@@ -0,0 +1,210 @@
+# src/goldfish.py
+# author: @taryaksama
+
+# Goldfish simulator: random limited decks of a set play alone against an empty board
+# Measures the damage dealt each turn and the number of turns needed to deal 20 damage ("turns to kill"),
+# a direct speed metric to compare with analyzeSetSpeed
+#
+# Simplified rules: one land per turn, lands produce any color, bodies attack from the turn after they are cast,
+# cheap non-land mana producers add one mana from the next turn, spells are cast greedily (most expensive first)
+# Games are simulated in batches as state arrays (one row per game), so millions of games stay fast
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import ClassVar, Optional, Tuple
+
+from .card_analyzer import producesMana, colorBitmask, COLOR_BITS
+from .card.body import classify_bodies
+from .simulator import StreamingStats
+from .set_analyzer import MetricsRecord
+
+DECK_SIZE = 40
+LANDS = 17
+OPENING_HAND = 7
+LIFE = 20
+PAIR_BITS = [COLOR_BITS[a] | COLOR_BITS[b] for i, a in enumerate(COLOR_BITS) for b in list(COLOR_BITS)[i + 1:]]
+
+def goldfishAttributes(cards: pd.DataFrame, quasi_bodies: bool = False) -> pd.DataFrame:
+    """
+    Per-card attributes used by the simulator: mana value ('cost'), power of the body obtained when cast
+    ('power', from `classify_bodies`), and whether the card adds a mana from the next turn ('ramp').
+    """
+    bodies = classify_bodies(cards)
+    isBody = bodies['is_body'] | (bodies['is_quasi_body'] if quasi_bodies else False)
+    types = cards['types'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+    isLand = types.apply(lambda x: 'Land' in x)
+    manaValue = pd.to_numeric(cards['manaValue'], errors='coerce').fillna(0)
+    keywords = cards['keywords'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+    ramp = cards['text'].apply(producesMana) & ~isLand & (manaValue <= 3) & keywords.apply(lambda x: 'Treasure' not in x)
+    return pd.DataFrame({
+        'cost': manaValue.astype(np.int64),
+        'power': np.where(isBody, bodies['body_power'].fillna(0), 0).astype(np.int64),
+        'ramp': ramp.astype(np.int64),
+        'isLand': isLand,
+    }, index=cards.index)
+
+class GoldfishSimulator():
+    """
+    Plays random two-color decks built from a set.
+
+    Each deck takes a random color pair, then 23 distinct non-land cards playable in that pair (color identity
+    included in the pair) and 17 lands. Games are played for `turns` turns, on the play (no draw on turn 1).
+
+    Example:
+    --------
+    simulator = GoldfishSimulator(load_set(allSets, 'OTJ', restriction='limited'), seed=0)
+    damage, kills = simulator.simulate(1_000_000)
+    damage.summary()          # damage dealt on each turn
+    simulator.kill_summary(kills)
+    """
+
+    def __init__(self, cards: pd.DataFrame, turns: int = 10, quasi_bodies: bool = False, seed=None) -> None:
+        self.cards = cards
+        self.turns = turns
+        self.rng = np.random.default_rng(seed)
+        self.attributes = goldfishAttributes(cards, quasi_bodies)
+
+        spells = ~self.attributes['isLand'].to_numpy()
+        bits = colorBitmask(cards['colorIdentity'])
+        self._cost = self.attributes['cost'].to_numpy()
+        self._power = self.attributes['power'].to_numpy()
+        self._ramp = self.attributes['ramp'].to_numpy()
+        self._pools = [np.flatnonzero(spells & ((bits & ~p) == 0)) for p in PAIR_BITS]
+        self._pools = [p for p in self._pools if len(p) >= DECK_SIZE - LANDS]
+        if not self._pools:
+            raise ValueError(f'No color pair has {DECK_SIZE - LANDS} playable non-land cards in the set')
+
+    def build_decks(self, n: int) -> tuple:
+        """
+        Returns (cost, power, ramp, isLand) arrays of shape (n, DECK_SIZE), one row per deck.
+        """
+        n_spells = DECK_SIZE - LANDS
+        picked = np.empty((n, n_spells), dtype=np.int64)
+        pair = self.rng.integers(len(self._pools), size=n)
+        for p, pool in enumerate(self._pools):
+            rows = np.flatnonzero(pair == p)
+            if len(rows):
+                keys = self.rng.random((len(rows), len(pool)))
+                picked[rows] = pool[np.argpartition(keys, n_spells - 1, axis=1)[:, :n_spells]]
+        zeros = np.zeros((n, LANDS), dtype=np.int64)
+        cost = np.hstack([self._cost[picked], zeros])
+        power = np.hstack([self._power[picked], zeros])
+        ramp = np.hstack([self._ramp[picked], zeros])
+        isLand = np.hstack([np.zeros((n, n_spells), dtype=bool), np.ones((n, LANDS), dtype=bool)])
+        return cost, power, ramp, isLand
+
+    def play(self, n: int) -> np.ndarray:
+        """
+        Plays `n` games; returns the damage dealt on each turn, an (n, turns) integer array.
+        """
+        cost, power, ramp, isLand = self.build_decks(n)
+        rows = np.arange(n)
+
+        # Cards are considered most expensive first when casting: sort the slots of each deck by cost
+        order = np.argsort(-cost, axis=1, kind='stable')
+        cost, power, ramp, isLand = (np.take_along_axis(a, order, axis=1) for a in (cost, power, ramp, isLand))
+        draws = np.argsort(self.rng.random((n, DECK_SIZE)), axis=1) # slot drawn at each draw
+
+        inHand = np.zeros((n, DECK_SIZE), dtype=bool)
+        inHand[rows[:, None], draws[:, :OPENING_HAND]] = True
+        landsInHand = (inHand & isLand).sum(axis=1)
+        inHand &= ~isLand
+        next_draw = OPENING_HAND
+
+        lands = np.zeros(n, dtype=np.int64)
+        extraMana = np.zeros(n, dtype=np.int64)
+        boardPower = np.zeros(n, dtype=np.int64)
+        damage = np.zeros((n, self.turns), dtype=np.int64)
+
+        for turn in range(self.turns):
+            if turn > 0 and next_draw < DECK_SIZE:
+                drawn = draws[:, next_draw]
+                drawnLand = isLand[rows, drawn]
+                landsInHand += drawnLand
+                inHand[rows[~drawnLand], drawn[~drawnLand]] = True
+                next_draw += 1
+
+            # Bodies already on the battlefield attack
+            damage[:, turn] = boardPower
+
+            played = landsInHand > 0
+            lands += played
+            landsInHand -= played
+
+            mana = lands + extraMana
+            newPower = np.zeros(n, dtype=np.int64)
+            newRamp = np.zeros(n, dtype=np.int64)
+            for slot in range(DECK_SIZE - LANDS):
+                cast = inHand[:, slot] & (cost[:, slot] <= mana)
+                mana -= np.where(cast, cost[:, slot], 0)
+                newPower += np.where(cast, power[:, slot], 0)
+                newRamp += np.where(cast, ramp[:, slot], 0)
+                inHand[:, slot] &= ~cast
+            boardPower += newPower
+            extraMana += newRamp
+        return damage
+
+    def simulate(self, n: int, batch_size: int = 20_000) -> tuple:
+        """
+        Simulates `n` games in batches.
+
+        Returns:
+        --------
+        tuple:
+            - `damage` (StreamingStats): damage dealt on each turn ('turn_1', ...).
+            - `kills` (numpy.ndarray): number of games won on each turn (index 0 for turn 1), last value
+              for the games not won within `turns`.
+        """
+        damage = StreamingStats([f'turn_{t + 1}' for t in range(self.turns)], max_value=4 * LIFE)
+        kills = np.zeros(self.turns + 1, dtype=np.int64)
+        done = 0
+        while done < n:
+            m = min(batch_size, n - done)
+            perTurn = self.play(m)
+            damage.update(perTurn)
+            total = np.cumsum(perTurn, axis=1)
+            killed = total >= LIFE
+            killTurn = np.where(killed.any(axis=1), killed.argmax(axis=1), self.turns)
+            kills += np.bincount(killTurn, minlength=self.turns + 1)
+            done += m
+        return damage, kills
+
+    def kill_summary(self, kills: np.ndarray) -> pd.DataFrame:
+        """
+        Probability of killing on each turn, and by each turn (cumulated).
+        """
+        p = kills / kills.sum()
+        index = [f'turn_{t + 1}' for t in range(self.turns)] + [f'after_turn_{self.turns}']
+        return pd.DataFrame({'p_kill': p, 'p_killed_by': np.cumsum(p)}, index=index)
+
+@dataclass(slots=True)
+class GoldfishMetrics(MetricsRecord):
+    meanTurnsToKill: float
+    medianTurnsToKill: int
+    meanDamageByTurn: dict
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('meanTurnsToKill', 'medianTurnsToKill', 'meanDamageByTurn')
+
+def analyzeSetGoldfish(cards, n_games=100_000, turns=10, seed=None):
+    """
+    Analyzes the speed of a set with the goldfish simulator (random two-color decks of the set).
+
+    Returns:
+    --------
+    GoldfishMetrics (unpacks as a tuple):
+        - `meanTurnsToKill` (float): mean turn on which 20 damage are dealt (games not won within `turns` count as `turns` + 1).
+        - `medianTurnsToKill` (int): median of the same.
+        - `meanDamageByTurn` (dict): mean damage dealt on each turn.
+
+    Example:
+    --------
+    meanTurnsToKill, medianTurnsToKill, meanDamageByTurn = analyzeSetGoldfish(cards)
+    buffer = MetricsBuffer(len(sets), records=MetricsBuffer.RECORDS + (GoldfishMetrics,))
+    """
+    simulator = GoldfishSimulator(cards, turns=turns, seed=seed)
+    damage, kills = simulator.simulate(n_games)
+    turn = np.arange(1, turns + 2)
+    meanTurnsToKill = float((kills * turn).sum() / kills.sum())
+    medianTurnsToKill = int(turn[np.argmax(np.cumsum(kills) >= kills.sum() / 2)])
+    meanDamageByTurn = dict(zip(range(1, turns + 1), damage.mean.tolist()))
+    return GoldfishMetrics(meanTurnsToKill, medianTurnsToKill, meanDamageByTurn)
@@ -1,4 +1,119 @@
 # src/graphs.py
 # author: @taryaksama
 
-# Functions to plot common graphs
\ No newline at end of file
+# Functions to plot common graphs
+# Per-metric series are sorted and normalized once, then served from a cache to the plotting functions
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from .set_compare import SetComparator
+
+class MetricSeriesCache():
+    """
+    Precomputes, for every metric of a set comparison table, the normalized values sorted in
+    descending order, so the interactive explorer only has to draw.
+
+    Parameters:
+    -----------
+    table : pandas.DataFrame
+        One row per set (ie. `set_sample` in main.ipynb). Nested metrics are flattened.
+    method : str or None
+        Normalization ('zscore', 'minmax') applied with `SetComparator`, or None to keep raw values.
+
+    Example:
+    --------
+    cache = MetricSeriesCache(set_sample)
+    widgets.interactive(lambda column_name, highlight_index: plot_metric(cache, column_name, highlight_index),
+                        column_name=cache.columns, highlight_index='')
+    """
+
+    def __init__(self, table: pd.DataFrame, method: Optional[str] = 'zscore') -> None:
+        self.comparator = SetComparator(table)
+        self.method = method
+        self._series: Dict[str, pd.Series] = {}
+        self.refresh()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._series)
+
+    def refresh(self) -> None:
+        """
+        Recomputes all the sorted series (after `self.comparator.add(...)`).
+        """
+        values = self.comparator.values if self.method is None else self.comparator.normalize(self.method)
+        self._series = {
+            column: values[column].dropna().sort_values(ascending=False)
+            for column in values.columns
+        }
+
+    def add(self, set_code: str, metrics) -> None:
+        self.comparator.add(set_code, metrics)
+        self.refresh()
+
+    def __getitem__(self, column: str) -> pd.Series:
+        return self._series[column]
+
+def plot_metric(
+        cache: MetricSeriesCache,
+        column_name: str,
+        highlight_index: Optional[str] = None,
+        ax=None,
+        color: str = 'blue',
+        highlight_color: str = 'red'
+        ):
+    """
+    Bar plot of one metric for all sets, sorted in descending order, with an optional highlighted set.
+    Draws on `ax` if given, else on a new pyplot figure which is shown.
+    """
+    s = cache[column_name]
+    show = ax is None
+    if ax is None:
+        fig, ax = plt.subplots(1, 1, figsize=(6, 4))
+
+    colors = [highlight_color if i == highlight_index else color for i in s.index]
+    ax.bar(np.arange(len(s)), s.to_numpy(), color=colors)
+    ax.set_xticks(np.arange(len(s)))
+    ax.set_xticklabels(s.index, rotation=90)
+    ax.set_ylabel(column_name)
+
+    if show:
+        plt.show()
+    return ax
+
+def render_all_metrics(
+        cache: MetricSeriesCache,
+        folder,
+        highlight_index: Optional[str] = None,
+        fmt: str = 'png',
+        figsize=(6, 4),
+        dpi: int = 100
+        ) -> List[Path]:
+    """
+    Renders one image file per metric in `folder`, without any interactive backend
+    (figures are created with `matplotlib.figure.Figure`, outside of pyplot).
+
+    Returns:
+    --------
+    list of pathlib.Path
+        The paths of the written files.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for column in cache.columns:
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
+        plot_metric(cache, column, highlight_index=highlight_index, ax=ax)
+        fig.tight_layout()
+        path = folder / f'{column}.{fmt}'
+        fig.savefig(path, dpi=dpi)
+        paths.append(path)
+    return paths
@@ -0,0 +1,273 @@
+# src/pipeline.py
+# author: @taryaksama
+
+# Asynchronous batch pipeline: stages (ie. load -> clean -> classify -> analyze -> sink) connected by bounded queues
+# A full queue blocks the stage feeding it (backpressure), so a slow stage never lets sets pile up in memory
+# CPU stages (pandas / regex work, bound by the GIL) run in worker processes, blocking I/O stages in threads;
+# throughput and queue depth are recorded per stage
+
+import asyncio
+import time
+import pandas as pd
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, List, Optional
+
+from .utils import load_set
+from .catalog import Catalog
+from .set_analyzer import analyzeSetMetrics
+from .card.effects import RULES, EFFECT_RULES
+from .card.body import classify_bodies
+from .feature_store import SetFeatures, fixing_flags
+
+_DONE = object() # end-of-stream marker passed between stages
+
+class StageStats():
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.processed = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.start = None
+        self.end = None
+        self.max_queue_depth = 0
+        self._depth_sum = 0
+        self._depth_samples = 0
+
+    def sample_depth(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._depth_sum += depth
+        self._depth_samples += 1
+
+    def as_dict(self) -> dict:
+        elapsed = (self.end or time.perf_counter()) - self.start if self.start is not None else 0.0
+        return {
+            'processed': self.processed,
+            'errors': self.errors,
+            'busy_s': self.busy_s,
+            'elapsed_s': elapsed,
+            'throughput_per_s': self.processed / elapsed if elapsed else 0.0,
+            'mean_queue_depth': self._depth_sum / self._depth_samples if self._depth_samples else 0.0,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+class Stage():
+    """
+    One step of a Pipeline.
+
+    Parameters:
+    -----------
+    name : str
+    func : callable
+        Called with one item, returns the item passed to the next stage.
+    workers : int
+        Number of items processed concurrently by the stage.
+    blocking : bool
+        If True (default), `func` runs in an executor of the pipeline; if False, `func` must be a coroutine function
+        (or a cheap function) and runs in the event loop.
+    process : bool
+        If True, `func` is CPU work and runs in a process pool: `func` (ie. a module-level function or a `partial`
+        of one), its items and its outputs must be picklable. If False, blocking `func` runs in a thread pool.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, blocking: bool = True, process: bool = False) -> None:
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.blocking = blocking or process
+        self.process = process
+
+class Pipeline():
+    """
+    Runs items through stages connected by bounded asyncio queues (size `maxsize`).
+
+    Items are processed concurrently inside and across stages, so the output order is not the input order:
+    stages should carry their own keys (ie. the set code). If an item fails in a stage, the error is counted
+    and the item is dropped (`on_error='skip'`) or the pipeline is stopped and the error raised (`on_error='raise'`).
+
+    Example:
+    --------
+    pipeline = set_analysis_pipeline(allSets, sink=lambda r: results.append(r))
+    await pipeline.run(sets)         # in a notebook (the event loop is already running)
+    pipeline.run_sync(sets)          # in a script
+    pd.DataFrame(pipeline.stats())
+    """
+
+    def __init__(
+            self,
+            stages: List[Stage],
+            maxsize: int = 4,
+            executor: Optional[Executor] = None,
+            on_error: str = 'raise'
+            ) -> None:
+        # `executor`, if given, runs all the blocking stages (process stages included); by default a thread pool
+        # runs the blocking stages and a process pool the process stages
+        if on_error not in ('raise', 'skip'):
+            raise ValueError("on_error must be 'raise' or 'skip'")
+        self.stages = stages
+        self.maxsize = maxsize
+        self.executor = executor
+        self.on_error = on_error
+        self._stats = {s.name: StageStats(s.name) for s in stages}
+
+    def stats(self) -> dict:
+        """
+        Per-stage statistics: processed items, errors, busy time, throughput, mean / max depth of the input queue.
+        """
+        return {name: s.as_dict() for name, s in self._stats.items()}
+
+    async def _feed(self, items: Iterable, queue: asyncio.Queue, n_consumers: int) -> None:
+        for item in items:
+            await queue.put(item)
+        for _ in range(n_consumers):
+            await queue.put(_DONE)
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], results: list, executor) -> None:
+        stats = self._stats[stage.name]
+        loop = asyncio.get_running_loop()
+        while True:
+            stats.sample_depth(inbox.qsize())
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            start = time.perf_counter()
+            try:
+                if stage.blocking:
+                    out = await loop.run_in_executor(executor, stage.func, item)
+                else:
+                    out = stage.func(item)
+                    if asyncio.iscoroutine(out):
+                        out = await out
+            except Exception:
+                stats.errors += 1
+                if self.on_error == 'raise':
+                    raise
+                continue
+            finally:
+                stats.busy_s += time.perf_counter() - start
+            stats.processed += 1
+            if outbox is not None:
+                await outbox.put(out)
+            else:
+                results.append(out)
+
+    async def _run_stage(self, stage: Stage, inbox, outbox, n_next: int, results: list, executor) -> None:
+        stats = self._stats[stage.name]
+        stats.start = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._worker(stage, inbox, outbox, results, executor) for _ in range(stage.workers)))
+        finally:
+            stats.end = time.perf_counter()
+        if outbox is not None:
+            for _ in range(n_next):
+                await outbox.put(_DONE)
+
+    async def run(self, items: Iterable) -> list:
+        """
+        Processes all the `items`; returns the outputs of the last stage.
+        """
+        self._stats = {s.name: StageStats(s.name) for s in self.stages}
+        queues = [asyncio.Queue(maxsize=self.maxsize) for _ in self.stages]
+        results = []
+        owned = []
+        if self.executor is not None:
+            threads = processes = self.executor
+        else:
+            threads = ThreadPoolExecutor(max_workers=sum(s.workers for s in self.stages if s.blocking and not s.process) or 1)
+            owned.append(threads)
+            processes = None
+            if any(s.process for s in self.stages):
+                processes = ProcessPoolExecutor(max_workers=sum(s.workers for s in self.stages if s.process))
+                owned.append(processes)
+        tasks = [asyncio.ensure_future(self._feed(items, queues[0], self.stages[0].workers))]
+        for i, stage in enumerate(self.stages):
+            last = i == len(self.stages) - 1
+            outbox = None if last else queues[i + 1]
+            n_next = 0 if last else self.stages[i + 1].workers
+            executor = processes if stage.process else threads
+            tasks.append(asyncio.ensure_future(self._run_stage(stage, queues[i], outbox, n_next, results, executor)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            for executor in owned:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def run_sync(self, items: Iterable) -> list:
+        return asyncio.run(self.run(items))
+
+# Stages of set_analysis_pipeline: module-level functions, so they can be sent to worker processes
+
+def load_stage(set_code: str, allSets) -> tuple:
+    # What a worker needs to load the set: the raw records of the set only (not the whole catalog),
+    # or the path of a binary Catalog, reopened (mmap) by the worker
+    if isinstance(allSets, Catalog):
+        return set_code, str(allSets.path)
+    return set_code, allSets.loc[[set_code]]
+
+def clean_stage(item: tuple, restriction: str) -> tuple:
+    set_code, raw = item
+    if isinstance(raw, str):
+        with Catalog(raw) as catalog:
+            return set_code, load_set(catalog, set_code, restriction)
+    return set_code, load_set(raw, set_code, restriction)
+
+def classify_stage(item: tuple, bodies: bool) -> tuple:
+    # Every per-card classification the analyze stage needs, computed once: the Effects flags (counted in the
+    # output), the fixing flags and, if `bodies`, the bodies (read by the analyzers through `store=`)
+    set_code, cards = item
+    features = {
+        'effects': RULES.evaluate(cards, EFFECT_RULES + ['is_interaction'], timed=False),
+        'fixing': fixing_flags(cards),
+    }
+    if bodies:
+        features['bodies'] = classify_bodies(cards)
+    return set_code, cards, SetFeatures(features)
+
+def analyze_stage(item: tuple, bodies: bool) -> dict:
+    set_code, cards, features = item
+    metrics = {'set_code': set_code, 'nCards': len(cards)}
+    metrics.update(analyzeSetMetrics(cards, store=features, bodies=bodies) if len(cards) else {})
+    effects = features.get(cards, 'effects')
+    metrics.update({f'n_{rule}': int(effects[rule].sum()) for rule in EFFECT_RULES + ['is_interaction']})
+    return metrics
+
+def set_analysis_pipeline(
+        allSets,
+        sink: Callable[[dict], Any] = None,
+        restriction: str = 'limited',
+        maxsize: int = 4,
+        workers: int = 2,
+        on_error: str = 'raise',
+        processes: bool = True,
+        bodies: bool = False
+        ) -> Pipeline:
+    """
+    Pipeline computing the metrics of analyzeSetMetrics for a list of set codes:
+    - load: raw records of the set (or the path of the Catalog), in the event loop
+    - clean: `load_set` with `restriction`
+    - classify: Effects flags, fixing flags and (if `bodies`) bodies of the cards, computed once per set
+    - analyze: metrics of the set (dict with 'set_code', the keys of analyzeSetMetrics with `bodies`, and the
+      'n_<rule>' counts of the Effects flags), reading the classified features instead of classifying again
+    - sink: `sink(metrics)` (ie. append to a list, write a row), in a thread; its return value is the pipeline output
+
+    clean, classify and analyze run in worker processes if `processes` (default), else in threads (only the
+    GIL-releasing parts then overlap).
+
+    Returns:
+    --------
+    Pipeline
+        `pipeline.run_sync(set_codes)`; with the default sink, the outputs are the metrics dicts.
+    """
+    return Pipeline([
+        Stage('load', partial(load_stage, allSets=allSets), workers=1, blocking=False),
+        Stage('clean', partial(clean_stage, restriction=restriction), workers=workers, process=processes),
+        Stage('classify', partial(classify_stage, bodies=bodies), workers=workers, process=processes),
+        Stage('analyze', partial(analyze_stage, bodies=bodies), workers=workers, process=processes),
+        Stage('sink', sink if sink is not None else (lambda metrics: metrics), workers=1),
+    ], maxsize=maxsize, on_error=on_error)
@@ -0,0 +1,257 @@
+# src/service.py
+# author: @taryaksama
+
+# Local HTTP service answering JSON queries over the analyzed catalog (standard library only)
+# The catalog is loaded once; loaded sets, Effects classifications and set metrics are kept in memory
+# and shared by all the requests, which are served concurrently (one thread per request)
+#
+# Routes (GET):
+#   /sets                                  set codes available
+#   /sets/<code>/metrics                   metrics of analyzeSetMetrics
+#   /sets/<code>/cards?rarity=&type=&color=&effect=&name=    filtered card list (effect flags and body classification)
+#   /sets/<code>/cards/<uuid or name>      features of one card
+#   /stats                                 request latency per route and cache sizes
+# Every set route accepts `restriction=` (default 'limited').
+
+import json
+import math
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .utils import load_set
+from .set_analyzer import analyzeSetMetrics
+from .card.effects import RULES, EFFECT_RULES
+from .card.body import classify_bodies
+
+SERVICE_RULES = EFFECT_RULES + ['is_interaction']
+LIST_COLUMNS = ['name', 'manaValue', 'manaCost', 'colorIdentity', 'power', 'toughness', 'rarity', 'types', 'uuid']
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+def _to_json(value):
+    # Converts numpy / pandas values to JSON values (NaN -> None)
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, (np.bool_, bool)):
+        return bool(value)
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if pd.isna(value):
+        return None
+    return str(value)
+
+class LatencyStats():
+    """
+    Latencies (ms) of the last `maxlen` requests of each route.
+    """
+
+    def __init__(self, maxlen: int = 1000) -> None:
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, route: str, ms: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(route, deque(maxlen=self.maxlen)).append(ms)
+            self._counts[route] = self._counts.get(route, 0) + 1
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            latencies = {r: np.array(l) for r, l in self._latencies.items()}
+            counts = dict(self._counts)
+        return {
+            r: {
+                'count': counts[r],
+                'mean_ms': float(l.mean()),
+                'p50_ms': float(np.percentile(l, 50)),
+                'p95_ms': float(np.percentile(l, 95)),
+                'max_ms': float(l.max()),
+            }
+            for r, l in latencies.items()
+        }
+
+class CatalogService():
+    """
+    Keeps the catalog and the derived results warm in memory and answers the queries of the routes above.
+
+    Example:
+    --------
+    service = CatalogService(allSets)              # or a binary Catalog (see catalog.py)
+    server = serve(service, port=8765)             # http://127.0.0.1:8765/sets/OTJ/metrics
+    client = ServiceClient(service)                # same queries, in-process (tests, notebooks)
+    client.get('/sets/OTJ/cards?rarity=common&effect=is_removal')
+    """
+
+    def __init__(self, allSets, default_restriction: str = 'limited') -> None:
+        self.allSets = allSets
+        self.default_restriction = default_restriction
+        self.latency = LatencyStats()
+        self._cache: Dict[tuple, object] = {}
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    # Cache shared by the request threads: each value is computed once, concurrent requests wait for it
+    def _cached(self, key: tuple, compute: Callable):
+        if key in self._cache:
+            return self._cache[key]
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+        return self._cache[key]
+
+    def set_codes(self) -> list:
+        sets = getattr(self.allSets, 'sets', None)
+        return list(sets) if sets is not None else list(self.allSets.index)
+
+    def cards(self, set_code: str, restriction: str) -> pd.DataFrame:
+        if set_code not in self.set_codes():
+            raise ServiceError(404, f"Unknown set '{set_code}'")
+        if restriction not in ('all', 'base_set', 'limited'):
+            raise ServiceError(400, f"Unknown restriction '{restriction}'")
+        return self._cached(('cards', set_code, restriction), lambda: load_set(self.allSets, set_code, restriction))
+
+    def features(self, set_code: str, restriction: str) -> pd.DataFrame:
+        # Effects flags and body classification of all the cards of the set
+        def compute():
+            cards = self.cards(set_code, restriction)
+            return pd.concat([RULES.evaluate(cards, SERVICE_RULES, timed=False), classify_bodies(cards)], axis=1)
+        return self._cached(('features', set_code, restriction), compute)
+
+    def metrics(self, set_code: str, restriction: str) -> dict:
+        def compute():
+            cards = self.cards(set_code, restriction)
+            if cards.empty:
+                raise ServiceError(404, f"No card in set '{set_code}' with restriction '{restriction}'")
+            return _to_json(analyzeSetMetrics(cards))
+        return self._cached(('metrics', set_code, restriction), compute)
+
+    def card_list(self, set_code: str, restriction: str, query: Dict[str, str]) -> list:
+        cards = self.cards(set_code, restriction)
+        features = self.features(set_code, restriction)
+        keep = np.ones(len(cards), dtype=bool)
+        if 'rarity' in query:
+            keep &= cards['rarity'].isin(query['rarity'].split(',')).to_numpy()
+        if 'type' in query:
+            keep &= cards['types'].apply(lambda x: query['type'] in x).to_numpy()
+        if 'color' in query:
+            keep &= cards['colorIdentity'].apply(lambda x: query['color'] in x).to_numpy()
+        if 'name' in query:
+            keep &= cards['name'].str.contains(query['name'], case=False, regex=False).to_numpy()
+        for rule in query.get('effect', '').split(','):
+            if rule:
+                if rule not in features:
+                    raise ServiceError(400, f"Unknown effect '{rule}'")
+                keep &= features[rule].to_numpy()
+        rows = cards.loc[keep, LIST_COLUMNS]
+        return [_to_json(r) for r in rows.to_dict(orient='records')]
+
+    def card(self, set_code: str, restriction: str, key: str) -> dict:
+        cards = self.cards(set_code, restriction)
+        match = np.flatnonzero(((cards['uuid'] == key) | (cards['name'] == key)).to_numpy())
+        if not len(match):
+            raise ServiceError(404, f"No card '{key}' in set '{set_code}'")
+        i = match[0]
+        card = cards.iloc[i].to_dict()
+        card.update(self.features(set_code, restriction).iloc[i].to_dict())
+        return _to_json(card)
+
+    def stats(self) -> dict:
+        kinds = {}
+        for key in list(self._cache):
+            kinds[key[0]] = kinds.get(key[0], 0) + 1
+        return {'latency': self.latency.summary(), 'cache': kinds}
+
+    def handle(self, path: str) -> Tuple[int, object]:
+        """
+        Answers one GET request. Returns (HTTP status, JSON-serializable payload).
+        """
+        start = time.perf_counter()
+        url = urlsplit(path)
+        parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        restriction = query.pop('restriction', self.default_restriction)
+        # Route labels of the latency stats: fixed templates only, so junk paths do not grow the map
+        route = '<unknown>'
+        try:
+            if parts == ['sets']:
+                route, status, payload = '/sets', 200, self.set_codes()
+            elif parts == ['stats']:
+                route, status, payload = '/stats', 200, self.stats()
+            elif len(parts) == 3 and parts[0] == 'sets' and parts[2] == 'metrics':
+                route = '/sets/<code>/metrics'
+                status, payload = 200, self.metrics(parts[1], restriction)
+            elif len(parts) == 3 and parts[0] == 'sets' and parts[2] == 'cards':
+                route = '/sets/<code>/cards'
+                status, payload = 200, self.card_list(parts[1], restriction, query)
+            elif len(parts) == 4 and parts[0] == 'sets' and parts[2] == 'cards':
+                route = '/sets/<code>/cards/<key>'
+                status, payload = 200, self.card(parts[1], restriction, parts[3])
+            else:
+                status, payload = 404, {'error': f"Unknown route '{url.path}'"}
+        except ServiceError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': f'{type(e).__name__}: {e}'}
+        self.latency.record(route, (time.perf_counter() - start) * 1000)
+        return status, payload
+
+class _Handler(BaseHTTPRequestHandler):
+    service: CatalogService = None
+
+    def do_GET(self):
+        status, payload = self.service.handle(self.path)
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(service: CatalogService, host: str = '127.0.0.1', port: int = 8765, background: bool = True) -> ThreadingHTTPServer:
+    """
+    Starts the HTTP server of `service` (one thread per request). With `background`, the server runs in
+    a daemon thread and is returned (stop it with `server.shutdown()`); otherwise this call blocks.
+    """
+    handler = type('Handler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+class ServiceClient():
+    """
+    In-process client of a CatalogService: same routes and JSON payloads as over HTTP, without a socket.
+    """
+
+    def __init__(self, service: CatalogService) -> None:
+        self.service = service
+
+    def get(self, path: str):
+        status, payload = self.service.handle(path)
+        payload = json.loads(json.dumps(payload))
+        if status != 200:
+            raise ServiceError(status, payload.get('error', ''))
+        return payload
@@ -6,8 +6,56 @@
 import numpy as np
 import pandas as pd
 import re
+from dataclasses import dataclass, fields
+from typing import ClassVar, Optional, Tuple
 
 from .card_analyzer import *
+from .card.interaction import classify_interactions
+from .card.mana import produced_colors
+from .analyzer_cache import ANALYZER_CACHE, cached_analyzer
+
+class MetricsRecord():
+    # Base of the results of the analyzeSet* functions: unpacks like the tuples they used to return
+    __slots__ = ()
+    COLUMNS: ClassVar[Tuple[str, ...]] = ()
+
+    def __iter__(self):
+        return (getattr(self, f.name) for f in fields(self))
+
+    def __len__(self) -> int:
+        return len(fields(self))
+
+    def __getitem__(self, i):
+        return tuple(self)[i]
+
+    def as_dict(self, prefix: str = '') -> dict:
+        # Metrics named as the columns of the set comparison table of main.ipynb
+        return {prefix + c: v for c, v in zip(self.COLUMNS, self)}
+
+@dataclass(slots=True)
+class SpeedMetrics(MetricsRecord):
+    limitedCreatureRatio: float
+    meanCreatureMV: float
+    meanPowerToMV: float
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('CreatureRatio', 'meanCreatureManaValue', 'meanCreaturePowerToManaValue')
+
+@dataclass(slots=True)
+class BoardStateMetrics(MetricsRecord):
+    meanCreaturePower: float
+    meanCreatureToughness: float
+    meanPowerToToughness: float
+    KWCount: dict
+    evasiveKWCount: dict
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('meanCreaturePower', 'meanCreatureToughness', 'meanCreaturePowerToToughness', 'KWCount', 'evasiveKWCount')
+
+@dataclass(slots=True)
+class FixingMetrics(MetricsRecord):
+    monocolorToMulticolorRatio: float
+    multiPipRatio: float
+    manaProducerRatio: float
+    nonLand_manaProducerRatio: float
+    manaProducerTypes: dict
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('MonoToMulticolorRatio', 'MultiPipRatio', 'manaProducerRatio', 'nonLand_manaProducerRatio', 'manaProducerTypes')
 
 def loadLimitedSet(allSets, set_code):
     """
@@ -69,7 +117,8 @@ def loadLimitedSet(allSets, set_code):
     
     return cards
 
-def analyzeSetSpeed(cards):
+@cached_analyzer(version='1', columns=['name', 'text', 'normalizedText', 'types', 'manaValue', 'power', 'toughness'])
+def analyzeSetSpeed(cards, bodies=False, store=None):
     """
     Analyzes the speed of a Magic: The Gathering set by focusing on creature cards.
 
@@ -87,11 +136,16 @@ def analyzeSetSpeed(cards):
     -----------
     cards : pandas.DataFrame
         A DataFrame containing Magic: The Gathering card data with columns such as 'types', 'manaValue', 'power', etc.
+    bodies : bool
+        If True, counts all the bodies and quasi-bodies of `classify_bodies` (token makers, vehicles, ...) with the
+        power of the body they give; if False, only the cards of type Creature.
+    store : FeatureStore, optional
+        If given, the bodies are read from the feature store (column 'uuid' required) instead of being classified again.
 
     Returns:
     --------
-    tuple:
-        - `limitedCreatureRatio` (float): Percentage of creature cards in the set.
+    SpeedMetrics (unpacks as a tuple):
+        - `limitedCreatureRatio` (float): Percentage of creature cards (or bodies) in the set.
         - `meanCreatureMV` (float): The average mana value of creatures.
         - `meanPowerToMV` (float): The average power-to-mana value ratio for creatures.
 
@@ -99,9 +153,14 @@ def analyzeSetSpeed(cards):
     --------
     limitedCreatureRatio, meanCreatureMV, meanPowerToMV = analyzeSetSpeed(cards)
     """
-    #--- @dev, should be replaced by isBody()
-    # Filter for 'Creature' only
-    cardsCreatureFiltered = cards[cards['types'].apply(lambda x: 'Creature' in x)].copy()
+    if bodies:
+        # Filter for bodies and quasi-bodies, with the power of the body obtained
+        b = classify_bodies(cards) if store is None else store.get(cards, 'bodies')
+        cardsCreatureFiltered = cards[b['is_body'] | b['is_quasi_body']].copy()
+        cardsCreatureFiltered['power'] = b['body_power']
+    else:
+        # Filter for 'Creature' only
+        cardsCreatureFiltered = cards[cards['types'].apply(lambda x: 'Creature' in x)].copy()
     
     # Ratio of creatures
     limitedCreatureRatio = (len(cardsCreatureFiltered) / len(cards)) * 100  # in percentage
@@ -118,8 +177,9 @@ def analyzeSetSpeed(cards):
     #cardsCreatureFiltered['normalizedCreatureManaValue'] = cardsCreatureFiltered['manaValue'] - meanCreatureMV # normalized columns
     #cardsCreatureFiltered['normalizedPowerToManaValue'] = cardsCreatureFiltered['power'] - meanPowerToMV # normalized columns
 
-    return limitedCreatureRatio, meanCreatureMV, meanPowerToMV
+    return SpeedMetrics(limitedCreatureRatio, meanCreatureMV, meanPowerToMV)
 
+@cached_analyzer(version='1', columns=['types', 'power', 'toughness', 'keywords'])
 def analyzeSetBoardState(cards):
     """
     Analyzes the board state of a Magic: The Gathering set by focusing on creature cards.
@@ -143,7 +203,7 @@ def analyzeSetBoardState(cards):
 
     Returns:
     --------
-    tuple:
+    BoardStateMetrics (unpacks as a tuple):
         - `meanCreaturePower` (float): The average power of creatures.
         - `meanCreatureToughness` (float): The average toughness of creatures.
         - `meanPowerToToughness` (float): The average power-to-toughness ratio.
@@ -195,9 +255,10 @@ def analyzeSetBoardState(cards):
 
     # @dev, can be added a ratio of evasive creature
 
-    return meanCreaturePower, meanCreatureToughness, meanPowerToToughness, KWCount, evasiveKWCount
+    return BoardStateMetrics(meanCreaturePower, meanCreatureToughness, meanPowerToToughness, KWCount, evasiveKWCount)
 
-def analyzeSetFixing(cards):
+@cached_analyzer(version='1', columns=['types', 'colorIdentity', 'manaCost', 'text', 'keywords'])
+def analyzeSetFixing(cards, store=None):
     """
     Analyzes the color fixing and mana production aspects of a Magic: The Gathering set.
 
@@ -221,10 +282,12 @@ def analyzeSetFixing(cards):
     -----------
     cards : pandas.DataFrame
         A DataFrame containing Magic: The Gathering card data, with columns such as 'types', 'colorIdentity', 'manaCost', 'text', 'keywords', etc.
+    store : FeatureStore, optional
+        If given, the multi-pip and mana producer flags are read from the feature store (column 'uuid' required).
 
     Returns:
     --------
-    tuple:
+    FixingMetrics (unpacks as a tuple):
         - `monocolorToMulticolorRatio` (float): The ratio of monocolor to multicolor non-land cards, in percentage.
         - `multiPipRatio` (float): The ratio of cards with multi-colored pips in their mana cost, in percentage.
         - `manaProducerRatio` (float): The ratio of cards that produce mana, in percentage.
@@ -245,64 +308,22 @@ def analyzeSetFixing(cards):
         ])
     monocolorToMulticolorRatio = (multicolor_nonland_cards / non_land_cards_total) * 100
     
-    # Multi-pip ratio --- @dev, should be moved to card_analyzer.py
-    def isMultiPip(s, letters_to_remove=None):
-        """
-        This function checks whether a card's mana cost contains more than one colored pip 
-        (i.e., multiple colored mana symbols). It removes specified characters (such as `{`, `}`, `C`, `X`, and digits) 
-        from the mana cost string to focus on the colored mana symbols. If the resulting string length is greater than 1, 
-        it is considered a "multi-pip" mana cost.
-
-        Parameters:
-        - s: A string representing the card's mana cost.
-        - letters_to_remove: A list of characters to remove from the mana cost string. Defaults to ['{', '}', 'C', 'X'].
-
-        Returns:
-        - True if the mana cost has more than one colored pip.
-        - False otherwise.
-        """
-  
-        if letters_to_remove is None:
-            letters_to_remove = ['{', '}', 'C', 'X']  # Assign default list safely
-    
-        if not isinstance(s, str):  # Handle NaN or non-string values
-            return False
-        
-        s = ''.join(c for c in s if c not in letters_to_remove and not c.isdigit())
-        return len(s) > 1
-    
-    multiPipRatio = (len(cards[cards['manaCost'].apply(isMultiPip)]) / non_land_cards_total) * 100
-    
-    # Mana producers
-    def producesMana(s): #---@dev TO BE TESTED FOR FETCH + to be put in card_analyzer.py
-        """
-        This function checks if a card has text indicating it produces mana. It looks for specific phrases such as 
-        "add X mana" or "add {" to identify cards that produce mana. The function uses regular expressions to detect 
-        the presence of these patterns in the card's text.
-
-        Parameters:
-        - s: A string representing the card's text description (specifically, its ability text).
-
-        Returns:
-        - True if the card produces mana, based on the specified patterns.
-        - False otherwise.
-        """
-        if not isinstance(s, str):
-            s = ""
-        
-        pattern1 = r'add (?:\d+|one|two|three|four|five) mana'
-        match1 = re.search(pattern1, s, re.IGNORECASE)
-    
-        pattern2 = r'add {'
-        match2 = re.search(pattern2, s, re.IGNORECASE)
-        
-        return bool(match1 or match2)
+    # Flags, precomputed in the feature store if any
+    if store is None:
+        multiPip = cards['manaCost'].apply(isMultiPip)
+        producer = cards['text'].apply(producesMana)
+    else:
+        fixing = store.get_flags(cards, 'fixing')
+        multiPip, producer = fixing['isMultiPip'], fixing['producesMana']
+
+    # Multi-pip ratio
+    multiPipRatio = (len(cards[multiPip]) / non_land_cards_total) * 100
     
     # Ratio of mana producers
-    n_manaProducer = len(cards[cards['text'].apply(producesMana)])
+    n_manaProducer = len(cards[producer])
     n_nonLand_manaProducer = len(
         cards[
-            cards['text'].apply(producesMana) 
+            producer 
             & (cards['types'].apply(lambda x: 'Land' not in x))
         ])
     manaProducerRatio = (n_manaProducer / len(cards)) * 100
@@ -327,7 +348,7 @@ def analyzeSetFixing(cards):
           {'Lands': count, 'Dorks': count, 'Rocks': count, 'Treasures': count}.
         """
         
-        df = data[data['text'].apply(producesMana)]
+        df = data[producer.loc[data.index].to_numpy()]
     
         # Non-basic Lands
         a = len(df[
@@ -364,4 +385,363 @@ def analyzeSetFixing(cards):
     # Type of mana produced
     # @dev, TBD in the future
 
-    return monocolorToMulticolorRatio, multiPipRatio, manaProducerRatio, nonLand_manaProducerRatio, manaProducerTypes
\ No newline at end of file
+    return FixingMetrics(monocolorToMulticolorRatio, multiPipRatio, manaProducerRatio, nonLand_manaProducerRatio, manaProducerTypes)
+
+def analyzeSetMetrics(cards, store=None, castability=True, bodies=False):
+    """
+    Runs analyzeSetSpeed, analyzeSetBoardState and analyzeSetFixing (and analyzeSetCastability if `castability`)
+    on a set and names their results as the columns of the set comparison table of main.ipynb (without the 'limited_' prefix).
+    `bodies` is passed to analyzeSetSpeed; with a `store` (FeatureStore or SetFeatures), the bodies and the
+    fixing flags are read from it.
+
+    Returns:
+    --------
+    dict
+        'CreatureRatio', 'meanCreatureManaValue', 'meanCreaturePowerToManaValue', 'meanCreaturePower',
+        'meanCreatureToughness', 'meanCreaturePowerToToughness', 'KWCount', 'evasiveKWCount',
+        'MonoToMulticolorRatio', 'MultiPipRatio', 'manaProducerRatio', 'nonLand_manaProducerRatio', 'manaProducerTypes',
+        and 'meanCastability', 'castabilityByManaValue', 'hardToCast'.
+
+    Example:
+    --------
+    metrics = analyzeSetMetrics(cards)
+    setCompare.loc[set_code, 'limited_CreatureRatio'] = metrics['CreatureRatio']
+    """
+    records = [analyzeSetSpeed(cards, bodies=bodies, store=store), analyzeSetBoardState(cards), analyzeSetFixing(cards, store=store)]
+    if castability:
+        from .castability import analyzeSetCastability # castability imports this module
+        records.append(analyzeSetCastability(cards))
+    metrics = {}
+    for record in records:
+        metrics.update(record.as_dict())
+    return metrics
+
+class MetricsBuffer():
+    """
+    Preallocated columnar table of the metrics of many sets, filled one set at a time without copying a DataFrame.
+
+    Numeric metrics are stored in float64 arrays, dict and list metrics (keyword counts, card names, ...) in
+    object arrays; the capacity doubles when full. Columns are named as in main.ipynb, with `prefix`.
+    `records` are the record classes whose columns are kept (other records, ie. CastabilityMetrics, can be added).
+
+    Example:
+    --------
+    buffer = MetricsBuffer(len(sets), prefix='limited_')
+    for set_code, cards in prefetch_sets(allSets, sets):
+        buffer.append(set_code, analyzeSetSpeed(cards), analyzeSetBoardState(cards), analyzeSetFixing(cards))
+    setCompare = setCompare.join(buffer.to_frame())
+    """
+
+    RECORDS = (SpeedMetrics, BoardStateMetrics, FixingMetrics)
+
+    def __init__(self, capacity: int = 64, prefix: str = '', records: Optional[Tuple[type, ...]] = None) -> None:
+        self.prefix = prefix
+        self.n = 0
+        self.index = []
+        self.records = tuple(records) if records is not None else self.RECORDS
+        self.columns = [prefix + c for r in self.records for c in r.COLUMNS]
+        self._object_columns = {
+            prefix + c for r in self.records for c, f in zip(r.COLUMNS, fields(r)) if f.type in (dict, list)
+        }
+        self._data = {c: self._allocate(c, max(1, capacity)) for c in self.columns}
+
+    def _allocate(self, column: str, capacity: int) -> np.ndarray:
+        if column in self._object_columns:
+            return np.empty(capacity, dtype=object)
+        return np.full(capacity, np.nan)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def append(self, set_code: str, *records: MetricsRecord) -> None:
+        """
+        Appends the metrics of one set (any of the records returned by the analyzeSet* functions).
+        """
+        capacity = len(self._data[self.columns[0]])
+        if self.n == capacity:
+            for c, values in self._data.items():
+                grown = self._allocate(c, 2 * capacity)
+                grown[:capacity] = values
+                self._data[c] = grown
+        for record in records:
+            for c, v in zip(record.COLUMNS, record):
+                self._data[self.prefix + c][self.n] = v
+        self.index.append(set_code)
+        self.n += 1
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({c: v[:self.n] for c, v in self._data.items()}, index=pd.Index(self.index, name=None))
+
+
+COLOR_PAIRS = ['WU', 'UB', 'BR', 'RG', 'GW', 'WB', 'UR', 'BG', 'RW', 'GU']
+
+def cardMasks(cards, bodies=False):
+    """
+    Computes once, for every card, all the boolean masks and numeric values used by the analyzeSet* metrics.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        A DataFrame of cards, as returned by `load_set`.
+    bodies : bool
+        Definition of the creatures of the speed metrics ('isBody', 'bodyManaValue', 'bodyPowerToManaValue'),
+        as in analyzeSetSpeed: bodies and quasi-bodies of `classify_bodies` if True, cards of type Creature if False.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Indexed like `cards`. Creature-only values ('creaturePower', 'bodyManaValue', ...) are NaN for the other cards,
+        so that grouped means match the means of analyzeSetSpeed / analyzeSetBoardState.
+    """
+    types = cards['types'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+    keywords = cards['keywords'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+
+    isCreature = types.apply(lambda x: 'Creature' in x).to_numpy()
+    isLand = types.apply(lambda x: 'Land' in x).to_numpy()
+    isArtifact = types.apply(lambda x: 'Artifact' in x).to_numpy()
+    hasTreasure = keywords.apply(lambda x: 'Treasure' in x).to_numpy()
+    producer = cards['text'].apply(producesMana).to_numpy()
+
+    power = pd.to_numeric(cards['power'], errors='coerce').to_numpy(float)
+    toughness = pd.to_numeric(cards['toughness'], errors='coerce').to_numpy(float)
+    manaValue = pd.to_numeric(cards['manaValue'], errors='coerce').to_numpy(float)
+    creature = lambda v: np.where(isCreature, v, np.nan)
+    if bodies:
+        b = classify_bodies(cards)
+        isBody = (b['is_body'] | b['is_quasi_body']).to_numpy()
+        bodyPower = b['body_power'].to_numpy(float)
+    else:
+        isBody, bodyPower = isCreature, power
+    body = lambda v: np.where(isBody, v, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        masks = pd.DataFrame({
+            'card': 1,
+            'isCreature': isCreature,
+            'isNonLand': ~isLand,
+            'isMulticolorNonLand': ~isLand & (cards['colorIdentity'].apply(len).to_numpy() > 1),
+            'isMultiPip': cards['manaCost'].apply(isMultiPip).to_numpy(),
+            'isManaProducer': producer,
+            'isNonLandManaProducer': producer & ~isLand,
+            'producerLands': producer & isLand,
+            'producerDorks': producer & isCreature & ~hasTreasure,
+            'producerRocks': producer & isArtifact & ~isCreature & ~hasTreasure,
+            'producerTreasures': producer & hasTreasure,
+            'isBody': isBody,
+            'bodyManaValue': body(manaValue),
+            'bodyPowerToManaValue': body(bodyPower / manaValue),
+            'creaturePower': creature(power),
+            'creatureToughness': creature(toughness),
+            'creaturePowerToToughness': creature(power / toughness),
+        }, index=cards.index)
+    evasive = np.zeros(len(cards), dtype=bool)
+    for kw in ['Flying', 'Trample', 'Menace']:
+        masks[f'evasive_{kw}'] = isCreature & keywords.apply(lambda x: kw in x).to_numpy()
+        evasive |= masks[f'evasive_{kw}'].to_numpy()
+    masks['isEvasiveCreature'] = evasive
+    return masks
+
+def _groupMembership(cards, by):
+    """
+    Returns (positions, group labels) of the cards belonging to each group of the grouping key `by`.
+    A card can belong to several groups (ie. a WU card is in the 'W' and the 'U' color groups).
+    """
+    n = len(cards)
+    if by == 'all':
+        return np.arange(n), np.full(n, 'all', dtype=object)
+    if by == 'rarity':
+        return np.arange(n), cards['rarity'].to_numpy(dtype=object)
+    if by == 'color':
+        # Colorless cards are grouped under 'C'
+        colors = [list(ci) if isinstance(ci, (list, tuple, np.ndarray)) and len(ci) else ['C'] for ci in cards['colorIdentity']]
+        lengths = np.fromiter((len(c) for c in colors), dtype=np.int64, count=n)
+        return np.repeat(np.arange(n), lengths), np.array([c for cs in colors for c in cs], dtype=object)
+    if by == 'color_pair':
+        # A card is playable in a pair when its color identity is included in the pair (colorless included)
+        bits = colorBitmask(cards['colorIdentity'])
+        pair_bits = np.array([COLOR_BITS[p[0]] | COLOR_BITS[p[1]] for p in COLOR_PAIRS])
+        member = (bits[:, None] & ~pair_bits[None, :]) == 0
+        rows, cols = np.nonzero(member)
+        return rows, np.array(COLOR_PAIRS, dtype=object)[cols]
+    if by in cards.columns:
+        return np.arange(n), cards[by].to_numpy(dtype=object)
+    raise ValueError(f"Unknown grouping key '{by}', expected 'all', 'rarity', 'color', 'color_pair' or a column of cards")
+
+def analyzeSetGroups(cards, by=('rarity', 'color', 'color_pair'), bodies=False):
+    """
+    Computes the metrics of analyzeSetSpeed, analyzeSetBoardState and analyzeSetFixing for every group
+    of cards (per rarity, per color of `colorIdentity`, per color pair, ...) in a single groupby pass.
+
+    The per-card masks are computed once (see `cardMasks`) and shared by all groups and all metrics.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        A DataFrame of cards, as returned by `load_set`.
+    by : str or tuple of str
+        Grouping keys among 'all', 'rarity', 'color', 'color_pair', or any column of `cards`.
+    bodies : bool
+        Creatures of the speed metrics ('CreatureRatio', 'meanCreatureManaValue', 'meanCreaturePowerToManaValue'),
+        with the same meaning as in analyzeSetSpeed.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Indexed by a MultiIndex ('grouping', 'group'), one column per metric:
+        'nCards', 'CreatureRatio', 'meanCreatureManaValue', 'meanCreaturePowerToManaValue',
+        'meanCreaturePower', 'meanCreatureToughness', 'meanCreaturePowerToToughness',
+        'evasive_Flying', 'evasive_Trample', 'evasive_Menace', 'EvasiveCreatureRatio' (creatures with at least one of them),
+        'MonoToMulticolorRatio', 'MultiPipRatio', 'manaProducerRatio', 'nonLand_manaProducerRatio',
+        'manaProducer_Lands', 'manaProducer_Dorks', 'manaProducer_Rocks', 'manaProducer_Treasures'.
+
+    Example:
+    --------
+    metrics = analyzeSetGroups(load_set(allSets, 'OTJ', restriction='base_set'), by=['rarity', 'color'])
+    metrics.loc[('color', 'W'), 'CreatureRatio']
+    """
+    by = (by,) if isinstance(by, str) else tuple(by)
+    masks = cardMasks(cards, bodies=bodies)
+
+    positions, groupings, groups = [], [], []
+    for key in by:
+        p, g = _groupMembership(cards, key)
+        positions.append(p)
+        groups.append(g)
+        groupings.append(np.full(len(p), key, dtype=object))
+    positions = np.concatenate(positions)
+
+    long = masks.iloc[positions].reset_index(drop=True)
+    long['grouping'] = np.concatenate(groupings)
+    long['group'] = np.concatenate(groups)
+    g = long.groupby(['grouping', 'group'], sort=False)
+    sums = g.sum(numeric_only=True)
+    means = g[[c for c in masks.columns if c.startswith(('creature', 'body'))]].mean()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = pd.DataFrame({
+            'nCards': sums['card'],
+            'CreatureRatio': sums['isBody'] / sums['card'] * 100,
+            'meanCreatureManaValue': means['bodyManaValue'],
+            'meanCreaturePowerToManaValue': means['bodyPowerToManaValue'],
+            'meanCreaturePower': means['creaturePower'],
+            'meanCreatureToughness': means['creatureToughness'],
+            'meanCreaturePowerToToughness': means['creaturePowerToToughness'],
+            'evasive_Flying': sums['evasive_Flying'],
+            'evasive_Trample': sums['evasive_Trample'],
+            'evasive_Menace': sums['evasive_Menace'],
+            'EvasiveCreatureRatio': sums['isEvasiveCreature'] / sums['isCreature'] * 100,
+            'MonoToMulticolorRatio': sums['isMulticolorNonLand'] / sums['isNonLand'] * 100,
+            'MultiPipRatio': sums['isMultiPip'] / sums['isNonLand'] * 100,
+            'manaProducerRatio': sums['isManaProducer'] / sums['card'] * 100,
+            'nonLand_manaProducerRatio': sums['isNonLandManaProducer'] / sums['card'] * 100,
+            'manaProducer_Lands': sums['producerLands'],
+            'manaProducer_Dorks': sums['producerDorks'],
+            'manaProducer_Rocks': sums['producerRocks'],
+            'manaProducer_Treasures': sums['producerTreasures'],
+        })
+    return result
+
+# Three-color archetypes of limited sets (shards then wedges)
+COLOR_TRIOS = ['GWU', 'WUB', 'UBR', 'BRG', 'RGW', 'WBG', 'URW', 'BGU', 'RWB', 'GUR']
+REMOVAL_TYPES = ['hard_removal', 'damage', 'bounce', 'fight', 'edict']
+CURVE_BUCKETS = ['1', '2', '3', '4', '5', '6+']
+
+def producedColorBitmask(cards):
+    """
+    Encodes the colors of mana each card can produce as a 5-bit integer (same bits as `colorBitmask`);
+    'mana of any color' counts as all the colors.
+    """
+    # Scanned once per distinct text of the set (produced_colors is not memoized)
+    texts = cards['text'].fillna('').astype(str)
+    unique = texts.unique()
+    bits = np.fromiter((produced_colors(t) for t in unique), dtype=np.int64, count=len(unique))[pd.Index(unique).get_indexer(texts)]
+    anyColor = cards['text'].fillna('').str.contains('mana of any color', case=False, regex=False).to_numpy()
+    return np.where(anyColor, sum(COLOR_BITS.values()), bits)
+
+def analyzeSetArchetypes(cards, trios=True):
+    """
+    Analyzes the two-color archetypes (and the three-color shards and wedges) of a limited set.
+
+    A card is playable in an archetype when its color identity is included in the colors of the archetype
+    (colorless cards are playable everywhere). The membership of all the cards in all the archetypes is one
+    boolean matrix computed from the color bitmasks, and every metric is a product of that matrix with a per-card
+    feature matrix, so all the archetypes are evaluated in one vectorized pass.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        A DataFrame of cards, as returned by `load_set` (ie. restriction='limited').
+    trios : bool
+        If True, the three-color archetypes of COLOR_TRIOS are evaluated after the pairs of COLOR_PAIRS.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per archetype, with columns:
+        - 'nColors', 'poolSize' (playable cards), 'goldCards' (cards of exactly the colors of the archetype),
+        - 'creatures' and the creature curve 'curve_1' ... 'curve_6+' (by mana value, 0 counted in 1),
+        - 'meanCreatureManaValue',
+        - 'removal' (hard removal, damage, bounce, fight or edict, see `classify_interactions`),
+        - 'manaProducers', 'dualSources' (producers of at least two colors of the archetype),
+        - 'multiPipRatio' (non-land playable cards with multiple pips, in percentage).
+
+    Example:
+    --------
+    archetypes = analyzeSetArchetypes(load_set(allSets, 'OTJ', restriction='limited'))
+    archetypes.sort_values('removal', ascending=False)
+    """
+    names = COLOR_PAIRS + (COLOR_TRIOS if trios else [])
+    archetypeBits = np.array([sum(COLOR_BITS[c] for c in a) for a in names])
+
+    bits = colorBitmask(cards['colorIdentity'])
+    member = (bits[:, None] & ~archetypeBits[None, :]) == 0
+    gold = bits[:, None] == archetypeBits[None, :]
+
+    types = cards['types'].apply(lambda x: x if isinstance(x, (list, tuple, np.ndarray)) else [])
+    isCreature = types.apply(lambda x: 'Creature' in x).to_numpy()
+    isLand = types.apply(lambda x: 'Land' in x).to_numpy()
+    manaValue = pd.to_numeric(cards['manaValue'], errors='coerce').fillna(0).to_numpy(float)
+    bucket = np.clip(manaValue, 1, len(CURVE_BUCKETS)).astype(int) - 1
+    curve = np.zeros((len(cards), len(CURVE_BUCKETS)))
+    curve[np.arange(len(cards)), bucket] = 1
+    curve *= isCreature[:, None]
+
+    interactions = classify_interactions(cards)
+    producer = cards['text'].apply(producesMana).to_numpy()
+    produced = producedColorBitmask(cards)
+
+    # Per-card features, summed over the members of each archetype in one matrix product
+    features = np.column_stack([
+        np.ones(len(cards)),
+        isCreature,
+        isCreature * manaValue,
+        interactions[REMOVAL_TYPES].any(axis=1).to_numpy(),
+        producer,
+        ~isLand,
+        ~isLand & cards['manaCost'].apply(isMultiPip).to_numpy(),
+        curve,
+    ]).astype(float)
+    sums = member.T.astype(float) @ features
+
+    # Producers of at least two colors of the archetype
+    shared = produced[:, None] & archetypeBits[None, :]
+    nShared = sum((shared >> i) & 1 for i in range(len(COLOR_BITS)))
+    dualSources = (member & producer[:, None] & (nShared >= 2)).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = pd.DataFrame({
+            'nColors': [len(a) for a in names],
+            'poolSize': sums[:, 0],
+            'goldCards': gold.sum(axis=0),
+            'creatures': sums[:, 1],
+            'meanCreatureManaValue': sums[:, 2] / sums[:, 1],
+            'removal': sums[:, 3],
+            'manaProducers': sums[:, 4],
+            'dualSources': dualSources,
+            'multiPipRatio': sums[:, 6] / sums[:, 5] * 100,
+        }, index=pd.Index(names, name='archetype'))
+    for i, b in enumerate(CURVE_BUCKETS):
+        result[f'curve_{b}'] = sums[:, 7 + i]
+    counts = ['poolSize', 'creatures', 'removal', 'manaProducers'] + [f'curve_{b}' for b in CURVE_BUCKETS]
+    result[counts] = result[counts].astype(int)
+    return result
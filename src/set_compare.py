@@ -0,0 +1,275 @@
+# src/set_compare.py
+# author: @taryaksama
+
+# Comparison of several sets of Magic the Gathering
+# Flattens the metrics returned by the analyzeSet* functions, normalizes them and computes distances between sets
+
+import warnings
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+SEP = '__' # separator between a nested metric and its key in flattened column names
+
+def flatten_metrics(table: pd.DataFrame, sep: str = SEP) -> pd.DataFrame:
+    """
+    Flattens the nested metrics of a set comparison table into numeric columns.
+
+    Dict-valued columns such as `limited_KWCount` or `limited_manaProducerTypes` (stored as dicts,
+    or as one-element lists of dicts as in main.ipynb) are expanded to one column per key,
+    e.g. `limited_KWCount__Flying`. Missing keys are counted as 0. Non-numeric columns are dropped.
+
+    Parameters:
+    -----------
+    table : pandas.DataFrame
+        One row per set, as built in main.ipynb (`setCompare`).
+    sep : str
+        Separator between the metric name and the key in the flattened column names.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        A float DataFrame with the same index as `table`.
+    """
+    def unwrap(v):
+        if isinstance(v, list) and len(v) == 1:
+            v = v[0]
+        return v if isinstance(v, dict) else None
+
+    numeric = {}
+    for column in table.columns:
+        values = table[column]
+        unwrapped = values.map(unwrap)
+        if unwrapped.notna().any():
+            expanded = pd.DataFrame.from_records(
+                [d if d is not None else {} for d in unwrapped],
+                index=table.index
+            ).fillna(0)
+            for key in expanded.columns:
+                numeric[f'{column}{sep}{key}'] = expanded[key].astype(float)
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            numeric[column] = values.astype(float)
+        else:
+            converted = pd.to_numeric(values, errors='coerce')
+            if converted.notna().any() and converted.notna().sum() == values.notna().sum():
+                numeric[column] = converted.astype(float)
+    return pd.DataFrame(numeric, index=table.index)
+
+class SetComparator():
+    """
+    Keeps running statistics (count, mean, variance, min, max) of the flattened metrics of a
+    collection of sets, so a new set can be added without refitting the whole table.
+
+    The flattened rows are buffered as numpy arrays and assembled into `values` once, when it is read
+    (as MetricsBuffer does), instead of concatenating a DataFrame at each `add`.
+
+    Example:
+    --------
+    comparator = SetComparator(set_sample)
+    comparator.add('FDN', new_row)
+    z = comparator.normalize(method='zscore')
+    distances = comparator.distance_matrix()
+    """
+
+    def __init__(self, table: Optional[pd.DataFrame] = None) -> None:
+        self._index = []      # set codes, in order of addition
+        self._position = {}   # set code -> row of the buffer
+        self._rows = []       # flattened metrics of each set (shorter than the columns if some were added later)
+        self._columns = []
+        self._column_position = {}
+        self._values = None   # assembled DataFrame, None when rows changed since
+        self._count = np.zeros(0)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self._min = np.zeros(0)
+        self._max = np.zeros(0)
+        if table is not None:
+            self.fit(table)
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self._columns)
+
+    @property
+    def values(self) -> pd.DataFrame:
+        # Flattened metrics of all the sets added so far (columns added after a set are 0 for it if they are
+        # flattened dict counts, NaN otherwise)
+        if self._values is None:
+            X = np.tile(self._fill_values(), (len(self._rows), 1))
+            for i, x in enumerate(self._rows):
+                X[i, :len(x)] = x
+            self._values = pd.DataFrame(X, index=pd.Index(self._index), columns=self.columns)
+        return self._values
+
+    def fit(self, table: pd.DataFrame) -> 'SetComparator':
+        """
+        (Re)computes the statistics from scratch on `table`.
+        """
+        values = flatten_metrics(table)
+        X = values.to_numpy(float)
+        self._index = list(values.index)
+        self._position = {code: i for i, code in enumerate(self._index)}
+        self._rows = list(X)
+        self._columns = list(values.columns)
+        self._column_position = {c: i for i, c in enumerate(self._columns)}
+        self._values = None
+        with np.errstate(invalid='ignore'):
+            self._count = np.sum(~np.isnan(X), axis=0).astype(float)
+            self._mean = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+            self._m2 = np.nansum((X - self._mean) ** 2, axis=0)
+            self._min = np.nanmin(X, axis=0) if len(X) else np.full(X.shape[1], np.inf)
+            self._max = np.nanmax(X, axis=0) if len(X) else np.full(X.shape[1], -np.inf)
+        return self
+
+    def _fill_values(self) -> np.ndarray:
+        # Value of each column for a set added before the column appeared
+        return np.array([0.0 if SEP in c else np.nan for c in self._columns])
+
+    def _extend_columns(self, new_columns: List[str]) -> None:
+        # New dict keys (ie. a keyword never seen before): previous sets count 0 for them
+        # Other new metrics are missing (NaN) for the previous sets, and ignored by the statistics
+        n_prev = len(self._rows)
+        counted = np.array([SEP in c and n_prev > 0 for c in new_columns], dtype=bool)
+        for c in new_columns:
+            self._column_position[c] = len(self._columns)
+            self._columns.append(c)
+        self._count = np.concatenate([self._count, np.where(counted, float(n_prev), 0.0)])
+        self._mean = np.concatenate([self._mean, np.zeros(len(new_columns))])
+        self._m2 = np.concatenate([self._m2, np.zeros(len(new_columns))])
+        self._min = np.concatenate([self._min, np.where(counted, 0.0, np.inf)])
+        self._max = np.concatenate([self._max, np.where(counted, 0.0, -np.inf)])
+
+    def _row(self, position: int) -> np.ndarray:
+        # Stored row padded to the current columns
+        x = self._rows[position]
+        return np.concatenate([x, self._fill_values()[len(x):]])
+
+    def add(self, set_code: str, metrics) -> None:
+        """
+        Adds (or replaces) one set, updating the running statistics in O(n_columns).
+
+        Parameters:
+        -----------
+        set_code : str
+            The code of the set, used as index.
+        metrics : dict or pandas.Series
+            The metrics of the set, possibly nested (dicts of keyword counts, ...).
+        """
+        row = flatten_metrics(pd.DataFrame([pd.Series(metrics, dtype=object)], index=[set_code]))
+        new_columns = [c for c in row.columns if c not in self._column_position]
+        if new_columns:
+            self._extend_columns(new_columns)
+        x = np.full(len(self._columns), np.nan)
+        x[[self._column_position[c] for c in row.columns]] = row.to_numpy(float)[0]
+        # Keys missing in this set are counts of 0 when they come from a flattened dict
+        count_columns = np.array([SEP in c for c in self._columns], dtype=bool)
+        x[count_columns & np.isnan(x)] = 0
+
+        replaced = self._position.get(set_code)
+        if replaced is not None:
+            # Reverse Welford update removing the previous values of the set
+            old = self._row(replaced)
+            present = ~np.isnan(old)
+            self._count[present] -= 1
+            delta = old[present] - self._mean[present]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(self._count[present] > 0, self._mean[present] - delta / self._count[present], 0.0)
+            self._m2[present] = np.where(self._count[present] > 0, self._m2[present] - delta * (old[present] - mean), 0.0)
+            self._mean[present] = mean
+            self._rows[replaced] = x
+        else:
+            self._position[set_code] = len(self._rows)
+            self._index.append(set_code)
+            self._rows.append(x)
+        self._values = None
+
+        # Welford update, ignoring missing values
+        present = ~np.isnan(x)
+        self._count[present] += 1
+        delta = x[present] - self._mean[present]
+        self._mean[present] += delta / self._count[present]
+        self._m2[present] += delta * (x[present] - self._mean[present])
+        if replaced is not None:
+            # Extrema cannot be updated backwards: recomputed on the buffered rows
+            with np.errstate(invalid='ignore'), warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                X = self.values.to_numpy(float)
+                self._min = np.where(self._count > 0, np.nanmin(X, axis=0), np.inf)
+                self._max = np.where(self._count > 0, np.nanmax(X, axis=0), -np.inf)
+        else:
+            self._min[present] = np.minimum(self._min[present], x[present])
+            self._max[present] = np.maximum(self._max[present], x[present])
+
+    def mean(self) -> pd.Series:
+        return pd.Series(self._mean, index=self.columns)
+
+    def std(self) -> pd.Series:
+        # Population standard deviation, as sklearn StandardScaler
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(np.sqrt(self._m2 / self._count), index=self.columns)
+
+    def normalize(self, method: str = 'zscore', table: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Normalizes the metrics with the running statistics.
+
+        Parameters:
+        -----------
+        method : str
+            'zscore' (as sklearn StandardScaler) or 'minmax' (as sklearn MinMaxScaler).
+        table : pandas.DataFrame, optional
+            Flattened metrics to normalize; defaults to all the sets added so far.
+        """
+        X = (self.values if table is None else table.reindex(columns=self.columns)).to_numpy(float)
+        if method == 'zscore':
+            scale = self.std().to_numpy()
+            center = self._mean
+        elif method == 'minmax':
+            scale = self._max - self._min
+            center = self._min
+        else:
+            raise ValueError(f"Unknown normalization '{method}', expected 'zscore' or 'minmax'")
+        scale = np.where((scale == 0) | ~np.isfinite(scale), 1, scale)
+        index = self.values.index if table is None else table.index
+        return pd.DataFrame((X - center) / scale, index=index, columns=self.columns)
+
+    def distance_matrix(
+            self,
+            method: str = 'zscore',
+            metric: str = 'euclidean',
+            columns: Optional[List[str]] = None
+            ) -> pd.DataFrame:
+        """
+        Pairwise distances between all sets, on normalized metrics.
+
+        Parameters:
+        -----------
+        method : str
+            Normalization applied first ('zscore' or 'minmax').
+        metric : str
+            'euclidean', 'manhattan' or 'cosine'.
+        columns : list of str, optional
+            Restricts the comparison to some metrics.
+
+        Returns:
+        --------
+        pandas.DataFrame
+            A square (n_sets, n_sets) DataFrame.
+        """
+        norm = self.normalize(method)
+        if columns is not None:
+            norm = norm[columns]
+        X = np.nan_to_num(norm.to_numpy(float))
+
+        if metric == 'euclidean':
+            sq = (X ** 2).sum(axis=1)
+            D = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2 * X @ X.T, 0))
+        elif metric == 'manhattan':
+            D = np.abs(X[:, None, :] - X[None, :, :]).sum(axis=2)
+        elif metric == 'cosine':
+            norms = np.linalg.norm(X, axis=1)
+            norms[norms == 0] = 1
+            D = 1 - (X @ X.T) / np.outer(norms, norms)
+        else:
+            raise ValueError(f"Unknown metric '{metric}', expected 'euclidean', 'manhattan' or 'cosine'")
+        np.fill_diagonal(D, 0)
+        return pd.DataFrame(D, index=norm.index, columns=norm.index)
@@ -0,0 +1,222 @@
+# src/similarity.py
+# author: @taryaksama
+
+# Card similarity : feature vectors built from card classifications and a nearest-neighbor index
+# Used to answer "the N most similar cards to this one" across one or many sets
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+from .card.effects import effect_flags
+
+COLORS = ['W', 'U', 'B', 'R', 'G']
+CARD_TYPES = ['Creature', 'Instant', 'Sorcery', 'Artifact', 'Enchantment', 'Land', 'Planeswalker', 'Battle']
+
+# Relative weight of each block of features in the final vector
+FEATURE_WEIGHTS = {
+    'stats': 1.0,
+    'colors': 0.5,
+    'types': 1.0,
+    'keywords': 0.75,
+    'effects': 0.75,
+}
+
+def _multi_hot(column: pd.Series, vocabulary: List[str]) -> np.ndarray:
+    """
+    Encodes a column of lists (keywords, types, colorIdentity) as a 0/1 matrix over `vocabulary`.
+    """
+    position = {v: i for i, v in enumerate(vocabulary)}
+    out = np.zeros((len(column), len(vocabulary)), dtype=np.float32)
+    for row, values in enumerate(column):
+        if isinstance(values, (list, tuple, np.ndarray)):
+            for v in values:
+                j = position.get(v)
+                if j is not None:
+                    out[row, j] = 1.0
+    return out
+
+def keyword_vocabulary(cards: pd.DataFrame, top_n: int = 40) -> List[str]:
+    """
+    Returns the `top_n` most frequent keywords of `cards`, used as the keyword axis of the feature vectors.
+    """
+    return cards['keywords'].explode().dropna().value_counts().head(top_n).index.to_list()
+
+def build_feature_matrix(
+        cards: pd.DataFrame,
+        keywords: Optional[List[str]] = None,
+        weights: Optional[dict] = None
+        ) -> pd.DataFrame:
+    """
+    Builds one numeric feature vector per card.
+
+    Parameters:
+    -----------
+    cards : pandas.DataFrame
+        Cards as returned by `load_set` (columns 'manaValue', 'power', 'toughness', 'colorIdentity', 'types', 'keywords', 'text').
+    keywords : list of str, optional
+        Keyword vocabulary. Defaults to the most frequent keywords of `cards`; pass the same list
+        when building the matrices of several catalogs that must be compared.
+    weights : dict, optional
+        Overrides of `FEATURE_WEIGHTS`.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        A float32 DataFrame indexed like `cards`, one column per feature.
+    """
+    w = {**FEATURE_WEIGHTS, **(weights or {})}
+    if keywords is None:
+        keywords = keyword_vocabulary(cards)
+
+    # Cost and P/T, scaled to roughly [0, 1]
+    stats = cards[['manaValue', 'power', 'toughness']].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(np.float32)
+    stats = np.clip(stats, 0, 10) / 10
+
+    blocks = [
+        ('stats', ['manaValue', 'power', 'toughness'], stats),
+        ('colors', [f'color_{c}' for c in COLORS], _multi_hot(cards['colorIdentity'], COLORS)),
+        ('types', [f'type_{t}' for t in CARD_TYPES], _multi_hot(cards['types'], CARD_TYPES)),
+        ('keywords', [f'kw_{k}' for k in keywords], _multi_hot(cards['keywords'], keywords)),
+    ]
+    flags = effect_flags(cards['text'], cards['name'])
+    blocks.append(('effects', [f'effect_{c}' for c in flags.columns], flags.to_numpy(np.float32)))
+
+    columns = [c for _, names, _ in blocks for c in names]
+    matrix = np.hstack([values * w[block] for block, _, values in blocks]).astype(np.float32)
+    return pd.DataFrame(matrix, index=cards.index, columns=columns)
+
+class CardIndex():
+    """
+    Nearest-neighbor index over card feature vectors.
+
+    Distances are computed block by block with matrix products, so memory stays bounded
+    on the full catalog (~100k printings). With `quantize=True` the vectors are stored as
+    int8 with one scale per feature, dividing the memory footprint by 4.
+
+    Example:
+    --------
+    index = CardIndex.from_cards(all_cards)
+    label = all_cards.index[all_cards['name']=='Wanted Griffin'][0]
+    neighbors = index.most_similar(label, k=10, mask=all_cards['rarity']=='common')
+    """
+
+    def __init__(
+            self,
+            features: pd.DataFrame,
+            metric: str = 'cosine',
+            quantize: bool = False,
+            block_size: int = 16384
+            ) -> None:
+        if metric not in ('cosine', 'l2'):
+            raise ValueError(f"Unknown metric '{metric}', expected 'cosine' or 'l2'")
+        self.metric = metric
+        self.block_size = block_size
+        self.labels = features.index
+        self.columns = features.columns
+
+        X = features.to_numpy(np.float32)
+        if metric == 'cosine':
+            norms = np.linalg.norm(X, axis=1, keepdims=True)
+            X = X / np.where(norms == 0, 1, norms)
+
+        self.quantized = quantize
+        if quantize:
+            self.scale = np.abs(X).max(axis=0) / 127
+            self.scale[self.scale == 0] = 1
+            self.X = np.round(X / self.scale).astype(np.int8)
+        else:
+            self.scale = None
+            self.X = X
+        self.sq_norms = None
+        if metric == 'l2':
+            self.sq_norms = np.concatenate([
+                (self._block(start, start + block_size) ** 2).sum(axis=1)
+                for start in range(0, len(X), block_size)
+            ]) if len(X) else np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def from_cards(cls, cards: pd.DataFrame, keywords: Optional[List[str]] = None, **kwargs) -> 'CardIndex':
+        return cls(build_feature_matrix(cards, keywords=keywords), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _block(self, start: int, stop: int) -> np.ndarray:
+        block = self.X[start:stop]
+        if self.quantized:
+            return block.astype(np.float32) * self.scale
+        return block
+
+    def _prepare(self, queries: np.ndarray) -> np.ndarray:
+        Q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.metric == 'cosine':
+            norms = np.linalg.norm(Q, axis=1, keepdims=True)
+            Q = Q / np.where(norms == 0, 1, norms)
+        return Q
+
+    def search(self, queries: np.ndarray, k: int = 10, mask: Optional[np.ndarray] = None):
+        """
+        Batch k-nearest-neighbor search.
+
+        Parameters:
+        -----------
+        queries : numpy.ndarray
+            Query vectors of shape (n_queries, n_features), built with the same columns as the index.
+        k : int
+            Number of neighbors returned per query.
+        mask : array of bool, optional
+            Restricts the candidates (e.g. only commons).
+
+        Returns:
+        --------
+        tuple:
+            - `positions` (numpy.ndarray): (n_queries, k) positions in the index, best first.
+            - `distances` (numpy.ndarray): (n_queries, k) distances (1 - cosine similarity, or euclidean distance).
+        """
+        Q = self._prepare(queries)
+        n_queries = len(Q)
+        mask = None if mask is None else np.asarray(mask, dtype=bool)
+        q_sq = (Q ** 2).sum(axis=1)[:, None] if self.metric == 'l2' else None
+
+        best_d = np.full((n_queries, 0), np.inf, dtype=np.float32)
+        best_i = np.zeros((n_queries, 0), dtype=np.int64)
+        for start in range(0, len(self), self.block_size):
+            stop = min(start + self.block_size, len(self))
+            dots = Q @ self._block(start, stop).T
+            if self.metric == 'cosine':
+                d = 1 - dots
+            else:
+                d = np.sqrt(np.maximum(q_sq - 2 * dots + self.sq_norms[start:stop], 0))
+            if mask is not None:
+                d[:, ~mask[start:stop]] = np.inf
+
+            # Keep the k best of (previous best + current block)
+            d = np.hstack([best_d, d])
+            i = np.hstack([best_i, np.broadcast_to(np.arange(start, stop), (n_queries, stop - start))])
+            kk = min(k, d.shape[1])
+            top = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+            best_d = np.take_along_axis(d, top, axis=1)
+            best_i = np.take_along_axis(i, top, axis=1)
+
+        order = np.argsort(best_d, axis=1, kind='stable')
+        best_d = np.take_along_axis(best_d, order, axis=1)
+        best_i = np.take_along_axis(best_i, order, axis=1)
+        found = np.isfinite(best_d)
+        return np.where(found, best_i, -1), best_d
+
+    def most_similar(self, label, k: int = 10, mask: Optional[np.ndarray] = None, include_self: bool = False) -> pd.DataFrame:
+        """
+        Returns the `k` cards most similar to the card at index `label`, as a DataFrame
+        with columns 'label' and 'distance'.
+        """
+        position = self.labels.get_loc(label)
+        mask = np.ones(len(self), dtype=bool) if mask is None else np.array(mask, dtype=bool)
+        if not include_self:
+            mask[position] = False
+        positions, distances = self.search(self._block(position, position + 1), k=k, mask=mask)
+        found = positions[0] >= 0
+        return pd.DataFrame({
+            'label': self.labels[positions[0][found]],
+            'distance': distances[0][found],
+        })
@@ -0,0 +1,186 @@
+# src/simulator.py
+# author: @taryaksama
+
+# Booster pack / sealed pool simulator
+# Estimates how the metrics of a set feel in actual play (creatures, mana producers and removal opened per pack or per pool)
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+from .card_analyzer import producesMana
+from .card.effects import effect_flags
+
+# Number of cards of each rarity in a booster (rare slot is upgraded to mythic with MYTHIC_RATE)
+PACK_SLOTS = {
+    'common': 10,
+    'uncommon': 3,
+    'rare': 1,
+}
+MYTHIC_RATE = 1 / 8
+
+def packAttributes(cards: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-card integer attributes summed by the simulator: creature, mana producer, removal (interaction).
+    """
+    flags = effect_flags(cards['text'], cards['name'])
+    removal = flags['is_targeting'] & (flags['is_removal'] | flags['is_damage'] | flags['is_sacrifice'] | flags['is_counter'])
+    return pd.DataFrame({
+        'creatures': cards['types'].apply(lambda x: 'Creature' in x),
+        'manaProducers': cards['text'].apply(producesMana),
+        'removal': removal,
+    }, index=cards.index).astype(np.int16)
+
+class StreamingStats():
+    """
+    Running summary statistics of integer-valued metrics, merged batch by batch (Chan et al. parallel
+    variance), with exact histograms so that quantiles are available without keeping the samples.
+    """
+
+    def __init__(self, columns, max_value: int = 64) -> None:
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.count = 0
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.hist = np.zeros((k, max_value + 1), dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        clipped = np.clip(values, 0, self.hist.shape[1] - 1).astype(np.int64)
+        for j in range(len(self.columns)):
+            self.hist[j] += np.bincount(clipped[:, j], minlength=self.hist.shape[1])
+
+    def quantile(self, q: float) -> np.ndarray:
+        cdf = np.cumsum(self.hist, axis=1)
+        return np.argmax(cdf >= q * self.count, axis=1)
+
+    def summary(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'mean': self.mean,
+            'std': np.sqrt(self.m2 / self.count) if self.count else np.nan,
+            'min': self.min,
+            'p10': self.quantile(0.10),
+            'median': self.quantile(0.50),
+            'p90': self.quantile(0.90),
+            'max': self.max,
+        }, index=self.columns)
+
+    def distribution(self) -> pd.DataFrame:
+        """
+        Probability of each value (columns) for each metric (rows).
+        """
+        used = int(self.max.max()) + 1 if self.count else 1
+        return pd.DataFrame(self.hist[:, :used] / max(self.count, 1), index=self.columns)
+
+class PackSimulator():
+    """
+    Samples booster packs from a set loaded with `load_set(..., restriction='base_set')`, respecting rarity slots.
+
+    Packs are drawn in batches with a numpy Generator (cards are drawn without replacement inside a slot),
+    aggregated, then folded into `StreamingStats`, so memory stays flat whatever the number of simulations.
+
+    Example:
+    --------
+    simulator = PackSimulator(load_set(allSets, 'OTJ', restriction='base_set'), seed=0)
+    stats = simulator.simulate(1_000_000)                  # per pack
+    pool_stats = simulator.simulate(100_000, pool_size=6)  # per sealed pool
+    stats.summary()
+    """
+
+    def __init__(
+            self,
+            cards: pd.DataFrame,
+            slots: Optional[Dict[str, int]] = None,
+            mythic_rate: float = MYTHIC_RATE,
+            seed=None
+            ) -> None:
+        self.cards = cards
+        self.slots = dict(PACK_SLOTS if slots is None else slots)
+        self.mythic_rate = mythic_rate
+        self.rng = np.random.default_rng(seed)
+
+        self.attributes = packAttributes(cards)
+        self._values = self.attributes.to_numpy()
+        rarity = cards['rarity'].to_numpy()
+        self._pools = {r: np.flatnonzero(rarity == r) for r in set(self.slots) | {'mythic'}}
+        for r, k in self.slots.items():
+            # Without any rare, the rare slots are filled with mythics
+            pool = 'mythic' if r == 'rare' and len(self._pools['rare']) == 0 else r
+            if k > len(self._pools[pool]):
+                raise ValueError(f"Not enough '{pool}' cards in set ({len(self._pools[pool])}) for {k} '{r}' slot(s)")
+
+    @property
+    def pack_size(self) -> int:
+        return sum(self.slots.values())
+
+    def _sample_slot(self, pool: np.ndarray, n: int, k: int) -> np.ndarray:
+        # k distinct cards of `pool` for each of the n packs, with Floyd's algorithm vectorized over the packs:
+        # memory is (n, k), whatever the size of the pool
+        if k == 0 or len(pool) == 0:
+            return np.zeros((n, 0), dtype=np.int64)
+        N = len(pool)
+        picked = np.empty((n, k), dtype=np.int64)
+        for i, j in enumerate(range(N - k, N)):
+            t = self.rng.integers(0, j + 1, size=n)
+            taken = (picked[:, :i] == t[:, None]).any(axis=1)
+            picked[:, i] = np.where(taken, j, t)
+        return pool[picked]
+
+    def sample_packs(self, n: int) -> np.ndarray:
+        """
+        Returns an (n, pack_size) array of positions in `cards`.
+
+        Each rare slot is upgraded to a mythic with probability `mythic_rate`, slot by slot; the mythics of a pack
+        are distinct, so with fewer mythics than rare slots only the first slots can be upgraded.
+        """
+        columns = []
+        for r, k in self.slots.items():
+            if r == 'rare' and len(self._pools['rare']) == 0:
+                picked = self._sample_slot(self._pools['mythic'], n, k)
+            else:
+                picked = self._sample_slot(self._pools[r], n, k)
+                k_mythic = min(k, len(self._pools['mythic'])) if r == 'rare' else 0
+                if k_mythic:
+                    mythics = self._sample_slot(self._pools['mythic'], n, k_mythic)
+                    upgrade = self.rng.random((n, k_mythic)) < self.mythic_rate
+                    picked[:, :k_mythic] = np.where(upgrade, mythics, picked[:, :k_mythic])
+            columns.append(picked)
+        return np.hstack(columns)
+
+    def simulate(self, n: int, pool_size: int = 1, batch_size: int = 100_000) -> StreamingStats:
+        """
+        Simulates `n` packs (pool_size=1) or `n` pools of `pool_size` packs (ie. 6 for sealed, 3 for a draft seat).
+
+        Returns:
+        --------
+        StreamingStats
+            Aggregates of the attributes of `packAttributes` per pack (or pool); call `.summary()` or `.distribution()`.
+        """
+        stats = StreamingStats(self.attributes.columns, max_value=self.pack_size * pool_size)
+        batch_pools = max(1, batch_size // pool_size)
+        done = 0
+        while done < n:
+            m = min(batch_pools, n - done)
+            packs = self.sample_packs(m * pool_size)
+            # Summed slot by slot: no (packs, pack_size, attributes) intermediate array
+            per_pack = np.zeros((len(packs), self._values.shape[1]), dtype=self._values.dtype)
+            for slot in range(packs.shape[1]):
+                per_pack += self._values[packs[:, slot]]
+            per_pool = per_pack.reshape(m, pool_size, -1).sum(axis=1)
+            stats.update(per_pool)
+            done += m
+        return stats
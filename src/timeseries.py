@@ -0,0 +1,164 @@
+# src/timeseries.py
+# author: @taryaksama
+
+# Evolution of the set metrics over the release history of Magic the Gathering
+# All the sets are loaded (prefetched), concatenated, then the metrics of all the sets are computed
+# in a single analyzeSetGroups pass grouped by set; trends and change points are computed on the whole table at once
+
+import numpy as np
+import pandas as pd
+from typing import List
+
+from .utils import prefetch_sets
+from .set_analyzer import analyzeSetGroups
+
+TREND_METRICS = [
+    'CreatureRatio',
+    'meanCreatureManaValue',
+    'EvasiveCreatureRatio',
+    'MonoToMulticolorRatio',
+    'MultiPipRatio',
+    'manaProducerRatio',
+]
+
+def set_history(allSets: pd.Series, set_types=('expansion',)) -> pd.DataFrame:
+    """
+    Sets of types `set_types` ordered by 'releaseDate', with columns 'name', 'type', 'releaseDate' (datetime).
+    """
+    info = pd.DataFrame.from_records(
+        [{k: s.get(k) for k in ('name', 'type', 'releaseDate')} for s in allSets],
+        index=allSets.index
+    )
+    info = info[info['type'].isin(list(set_types))].copy()
+    info['releaseDate'] = pd.to_datetime(info['releaseDate'])
+    return info.sort_values(by='releaseDate', kind='stable')
+
+def history_metrics(
+        allSets,
+        set_codes: List[str] = None,
+        set_types=('expansion',),
+        restriction: str = 'limited',
+        n_prefetch: int = 4
+        ) -> pd.DataFrame:
+    """
+    Computes the metrics of `analyzeSetGroups` for every set of the release history.
+
+    Parameters:
+    -----------
+    allSets : pandas.Series or Catalog
+        The 'data' of AllPrintings.json indexed by set code (or a binary `Catalog`, faster to slice).
+    set_codes : list of str, optional
+        Sets to analyze; by default all the sets of `set_types`. Required with a Catalog (a ValueError is raised
+        otherwise), which has no set types nor release dates: the rows then stay in the order of `set_codes`.
+    restriction : str
+        Passed to `load_set` ('limited' by default, as in main.ipynb).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per set in release order (index: set code), 'releaseDate' then one float32 column per metric.
+        Sets without any card left after `restriction` are skipped.
+
+    Example:
+    --------
+    history = history_metrics(allSets)
+    rolling_metrics(history, window=8)['CreatureRatio'].plot()
+    """
+    info = set_history(allSets, set_types) if isinstance(allSets, pd.Series) else None
+    if set_codes is None:
+        if info is None:
+            # A Catalog has no set types nor release dates to build the release history from
+            raise ValueError('set_codes is required when allSets is a Catalog, eg. list(set_history(allSets_series).index)')
+        set_codes = list(info.index)
+    elif info is not None:
+        info = set_history(allSets, set_types=allSets[list(set_codes)].map(lambda s: s.get('type')).unique())
+
+    frames = []
+    for set_code, cards in prefetch_sets(allSets, set_codes, restriction=restriction, n_prefetch=n_prefetch):
+        if len(cards):
+            frames.append(cards.assign(set_code=set_code))
+    if not frames:
+        return pd.DataFrame()
+    cards = pd.concat(frames, ignore_index=True)
+
+    metrics = analyzeSetGroups(cards, by='set_code').loc['set_code']
+    metrics = metrics.astype(np.float32)
+    metrics.index.name = 'set_code'
+    order = [s for s in set_codes if s in metrics.index]
+    metrics = metrics.loc[order]
+    if info is not None:
+        metrics.insert(0, 'releaseDate', info['releaseDate'].reindex(metrics.index))
+        metrics = metrics.sort_values(by='releaseDate', kind='stable')
+    return metrics
+
+def _metric_values(history: pd.DataFrame, metrics: List[str] = None) -> pd.DataFrame:
+    metrics = TREND_METRICS if metrics is None else metrics
+    return history[[m for m in metrics if m in history.columns]].astype(float)
+
+def rolling_metrics(history: pd.DataFrame, window: int = 5, metrics: List[str] = None, min_periods: int = 1) -> pd.DataFrame:
+    """
+    Rolling mean of the metrics over the last `window` sets (trend lines), in release order.
+    """
+    return _metric_values(history, metrics).rolling(window, min_periods=min_periods).mean()
+
+def change_scores(history: pd.DataFrame, window: int = 5, metrics: List[str] = None) -> pd.DataFrame:
+    """
+    For each set and metric, Welch t-statistic between the `window` sets released from this set on
+    and the `window` sets released before it. Large absolute values mark a shift in the metric.
+
+    Computed for all sets and metrics at once with cumulative sums (NaN values are ignored).
+    """
+    values = _metric_values(history, metrics)
+    x = values.to_numpy()
+    valid = ~np.isnan(x)
+    x0 = np.where(valid, x, 0.0)
+
+    def cumulative(a):
+        return np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+    s1, s2, cnt = cumulative(x0), cumulative(x0 ** 2), cumulative(valid.astype(float))
+
+    n = len(x)
+    i = np.arange(n)
+    lo, hi = np.clip(i - window, 0, n), np.clip(i + window, 0, n)
+
+    def stats(a, b):
+        k = cnt[b] - cnt[a]
+        mean = (s1[b] - s1[a]) / k
+        var = ((s2[b] - s2[a]) - k * mean ** 2) / (k - 1)
+        return k, mean, var
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_l, mean_l, var_l = stats(lo, i)
+        k_r, mean_r, var_r = stats(i, hi)
+        score = (mean_r - mean_l) / np.sqrt(np.maximum(var_l, 0) / k_l + np.maximum(var_r, 0) / k_r)
+    score[(k_l < 2) | (k_r < 2)] = np.nan
+    return pd.DataFrame(score, index=values.index, columns=values.columns)
+
+def change_points(history: pd.DataFrame, window: int = 5, threshold: float = 3.0, metrics: List[str] = None) -> pd.DataFrame:
+    """
+    Sets where a metric shifts: the absolute change score (`change_scores`) is above `threshold` and is
+    the largest within `window` sets around it.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per change point, with columns 'set_code', 'metric', 'score', 'before' and 'after'
+        (mean of the metric over the `window` sets before / from the change point).
+    """
+    scores = change_scores(history, window, metrics)
+    magnitude = scores.abs()
+    local_max = magnitude.rolling(2 * window + 1, center=True, min_periods=1).max()
+    peaks = (magnitude >= threshold) & (magnitude == local_max)
+
+    values = _metric_values(history, list(scores.columns))
+    before = values.rolling(window, min_periods=1).mean().shift(1)
+    after = values[::-1].rolling(window, min_periods=1).mean()[::-1]
+
+    rows, cols = np.nonzero(peaks.to_numpy())
+    return pd.DataFrame({
+        'set_code': scores.index[rows],
+        'metric': scores.columns[cols],
+        'score': scores.to_numpy()[rows, cols],
+        'before': before.to_numpy()[rows, cols],
+        'after': after.to_numpy()[rows, cols],
+    })
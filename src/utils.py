@@ -6,15 +6,40 @@
 import numpy as np
 import pandas as pd
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .card.parser import normalize_set_texts
 
 def load_card():
     ...
 
+def base_set_positions(names, texts, base_set_size) -> list:
+    """
+    Positions of the cards of the base set in the records of a set: the cards before the first basic Land
+    (a Plains), or the first `base_set_size` cards if there is none, without duplicates (same name and
+    text, first printing kept).
+    """
+    n_firstPlains = next((i for i, n in enumerate(names) if n == 'Plains'), None)
+    if n_firstPlains is None: # case when there is no basic land in set (commander sets, MAT, ...)
+        n_firstPlains = base_set_size
+    seen, positions = set(), []
+    for i, key in enumerate(zip(names[:n_firstPlains], texts[:n_firstPlains])):
+        if key not in seen:
+            seen.add(key)
+            positions.append(i)
+    return positions
+
 def load_set(
         set_card_list:pd.DataFrame,
         set_code: str, 
-        restriction='all'
+        restriction='all',
+        rarities=('common', 'uncommon')
         ) -> pd.DataFrame:
+
+    # Binary catalog (see catalog.py): slices the set without parsing
+    if hasattr(set_card_list, 'load_set'):
+        return set_card_list.load_set(set_code, restriction, rarities)
     
     # Define cards features to be analyzed
     FEATURES_ANALYZED = [
@@ -27,34 +52,89 @@ def load_set(
         'toughness',
         'rarity',
         'types',
-        'text']
+        'supertypes',
+        'text',
+        'uuid']
 
-    # Load cards
-    df = pd.DataFrame.from_dict(set_card_list.loc[set_code]['cards'])
+    set_data = set_card_list.loc[set_code]
+    records = set_data['cards']
 
     if restriction=='all':
-        cards = df
+        cards = pd.DataFrame.from_dict(records)
 
-    def get_base_set(d):
-        # Remove card numbers after the first basic Land (a Plains)
-        n_firstPlains = d.loc[d['name']=='Plains'].first_valid_index()
-        if n_firstPlains == None: # case when there is no basic land in set (commander sets, MAT, ...)
-            cards = d.loc[:set_card_list.loc[set_code]['baseSetSize']-1, FEATURES_ANALYZED]
-        else: c = d.loc[:n_firstPlains-1, FEATURES_ANALYZED]
-
-        # Clean duplicates
-        c = c.drop_duplicates(subset=['name','text'], keep='first')
+    def get_base_set(records):
+        # Base set selected on the raw records: only the surviving cards are put in a DataFrame
+        positions = base_set_positions([r.get('name') for r in records], [r.get('text') for r in records], set_data.get('baseSetSize'))
+        c = pd.DataFrame.from_records([records[i] for i in positions], columns=FEATURES_ANALYZED, index=positions)
     
         # Clean numeric data
-        c[['manaValue', 'power', 'toughness']] = c[['manaValue', 'power', 'toughness']].apply(pd.to_numeric, errors='coerce').fillna(0)
+        c[['manaValue', 'power', 'toughness']] = c[['manaValue', 'power', 'toughness']].apply(pd.to_numeric, errors='coerce').fillna(0).astype(float)
 
         return c
         
     if restriction=='base_set':
-        cards = get_base_set(df)
+        cards = get_base_set(records)
+
+    if restriction=='limited': # Keep only the rarities of limited play (common and uncommon by default)
+        cards = get_base_set(records)
+        cards = cards[cards['rarity'].isin(list(rarities))]
+
+    # Text where the card name is replaced by a placeholder, used by the effect patterns
+    cards = cards.copy()
+    cards['normalizedText'] = normalize_set_texts(cards)
+
+    return cards
+
+def prefetch_sets(
+        set_card_list,
+        set_codes,
+        restriction='limited',
+        rarities=('common', 'uncommon'),
+        n_prefetch: int = 3,
+        n_workers: int = 2
+        ):
+    """
+    Iterates over `set_codes`, yielding (set_code, cards) as `load_set` would, while the next sets are
+    loaded and cleaned on background threads during the analysis of the current one.
+
+    At most `n_prefetch` sets are held at once, the one being analyzed included (so `n_prefetch - 1` are
+    loaded ahead), which caps the memory used. Errors raised while loading a set are raised when that set is reached.
+
+    The gain depends on the source: with a binary Catalog (see catalog.py) the threads overlap real reads of the
+    mmapped file; with `allSets` already in memory, loading is CPU work and only its GIL-releasing parts (numpy,
+    pandas internals) overlap the analysis. For CPU parallelism, use `set_analysis_pipeline` (worker processes).
+
+    Example:
+    --------
+    catalog = Catalog('data/AllPrintings.wbcat')
+    for set_code, cards in tqdm(prefetch_sets(catalog, sets), total=len(sets)):
+        limitedCreatureRatio, meanCreatureMV, meanPowerToMV = analyzeSetSpeed(cards)
+    """
+    set_codes = iter(set_codes)
+    executor = ThreadPoolExecutor(max_workers=max(1, n_workers))
+    pending = deque()
 
-    if restriction=='limited': # Keep only common and uncommon cards
-        cards = get_base_set(df)
-        cards = cards[cards['rarity'].isin(['common', 'uncommon'])]
+    def submit_next() -> bool:
+        set_code = next(set_codes, None)
+        if set_code is None:
+            return False
+        pending.append((set_code, executor.submit(load_set, set_card_list, set_code, restriction, rarities)))
+        return True
 
-    return cards
\ No newline at end of file
+    try:
+        for _ in range(max(1, n_prefetch)):
+            if not submit_next():
+                break
+        while pending:
+            set_code, future = pending.popleft()
+            cards = future.result()
+            del future
+            yield set_code, cards
+            # The current set is released before the next one is requested: the window stays at n_prefetch sets
+            del cards
+            submit_next()
+    finally:
+        # Loop interrupted (break, exception): drop what was loaded ahead
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
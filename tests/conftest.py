@@ -0,0 +1,8 @@
+# tests/conftest.py
+# author: @taryaksama
+
+import sys
+from pathlib import Path
+
+# The package is used from the repository (`from src import ...`), as in main.ipynb
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,27 @@
+# tests/test_parser.py
+# author: @taryaksama
+
+# Tests of the card text parser (src/card/parser.py) and of the Effects rules reading it
+
+from src.card.parser import parse_text
+from src.card.effects import Effects
+
+GRANTED = 'Equipped creature has "{T}: This creature deals 1 damage to target creature."\nEquip {2}'
+
+def test_granted_abilities_are_kept_apart():
+    ability = parse_text(GRANTED).abilities[0]
+    assert ability.kind == 'static'
+    assert ability.granted == ('{t}: this creature deals 1 damage to target creature.',)
+    assert 'damage' not in ability.effect
+    assert 'damage' in ability.text
+
+def test_granted_abilities_are_seen_by_the_rules():
+    parsed = parse_text(GRANTED)
+    assert {'deals', 'damage', 'target'} <= parsed.words
+    effects = Effects(GRANTED, 'Sparking Rod', ['Artifact'])
+    assert effects.is_damage() and effects.is_targeting() and effects.is_interaction()
+    assert Effects('Creatures you control have "{T}: Add {G}."', 'Song of Growth', ['Enchantment']).produces_mana()
+
+def test_self_reference():
+    assert parse_text('When Aven Interrupter enters, draw a card.', 'Aven Interrupter').abilities[0].trigger == 'when cardname enters'
+    assert Effects('When Aven Interrupter enters, draw a card.', 'Aven Interrupter', ['Creature']).is_ETB()
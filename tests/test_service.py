@@ -0,0 +1,105 @@
+# tests/test_service.py
+# author: @taryaksama
+
+# Tests of the catalog service (src/service.py) on a small synthetic catalog, with the in-process client
+# and once over HTTP
+
+import json
+import urllib.request
+import urllib.error
+import pandas as pd
+import pytest
+
+from src.service import CatalogService, ServiceClient, ServiceError, serve
+
+def _card(name, rarity, types, text, mana_cost, mana_value, colors, power=None, toughness=None, keywords=None):
+    return dict(
+        name=name, rarity=rarity, types=types, text=text, manaCost=mana_cost, manaValue=mana_value,
+        colorIdentity=colors, power=power, toughness=toughness, keywords=keywords, supertypes=[],
+    )
+
+CARDS = [
+    _card('Wanted Griffin', 'common', ['Creature'], 'Flying\nWhen Wanted Griffin dies, create a 1/1 red Mercenary creature token.', '{3}{W}', 4.0, ['W'], '3', '2', ['Flying']),
+    _card('Shock', 'common', ['Instant'], 'Shock deals 2 damage to any target.', '{R}', 1.0, ['R']),
+    _card('Murder', 'uncommon', ['Instant'], 'Destroy target creature.', '{1}{B}{B}', 3.0, ['B']),
+    _card('Llanowar Elves', 'common', ['Creature'], '{T}: Add {G}.', '{G}', 1.0, ['G'], '1', '1'),
+    _card('Serra Angel', 'uncommon', ['Creature'], 'Flying, vigilance', '{3}{W}{W}', 5.0, ['W'], '4', '4', ['Flying', 'Vigilance']),
+    _card('Cancel', 'common', ['Instant'], 'Counter target spell.', '{1}{U}{U}', 3.0, ['U']),
+    _card('Hypnotic Specter', 'rare', ['Creature'], 'Flying\nWhenever Hypnotic Specter deals damage to an opponent, that player discards a card at random.', '{1}{B}{B}', 3.0, ['B'], '2', '2', ['Flying']),
+    _card('Plains', 'common', ['Land'], '({T}: Add {W}.)', None, 0.0, ['W']),
+]
+
+@pytest.fixture(scope='module')
+def all_sets():
+    cards = [dict(c, uuid=f'TST-{i}', number=str(i + 1)) for i, c in enumerate(CARDS)]
+    return pd.Series({'TST': dict(cards=cards, baseSetSize=7, code='TST', name='Test set')})
+
+@pytest.fixture(scope='module')
+def client(all_sets):
+    return ServiceClient(CatalogService(all_sets))
+
+def test_sets(client):
+    assert client.get('/sets') == ['TST']
+
+def test_metrics(client):
+    metrics = client.get('/sets/TST/metrics')
+    # limited: commons and uncommons of the base set (before the first Plains)
+    assert metrics['CreatureRatio'] == pytest.approx(100 * 3 / 6)
+    assert metrics['evasiveKWCount'] == {'Flying': 2, 'Trample': 0, 'Menace': 0}
+    assert 0 < metrics['meanCastability'] <= 100 and isinstance(metrics['hardToCast'], list)
+    assert client.get('/sets/TST/metrics?restriction=base_set')['CreatureRatio'] == pytest.approx(100 * 4 / 7)
+
+def test_card_features(client):
+    card = client.get('/sets/TST/cards/Murder')
+    assert card['uuid'] == 'TST-2'
+    assert card['is_removal'] is True and card['is_interaction'] is True
+    assert client.get('/sets/TST/cards/TST-0')['is_body'] is True
+
+def test_card_list_filters(client):
+    names = lambda path: sorted(c['name'] for c in client.get(path))
+    assert names('/sets/TST/cards?rarity=uncommon') == ['Murder', 'Serra Angel']
+    assert names('/sets/TST/cards?type=Creature&color=W') == ['Serra Angel', 'Wanted Griffin']
+    assert names('/sets/TST/cards?effect=is_interaction') == ['Cancel', 'Murder', 'Shock']
+    assert names('/sets/TST/cards?name=elves') == ['Llanowar Elves']
+    assert names('/sets/TST/cards?restriction=all&rarity=rare') == ['Hypnotic Specter']
+
+def test_errors(client):
+    for path, status in [
+            ('/sets/XXX/metrics', 404),
+            ('/sets/TST/cards/Nope', 404),
+            ('/sets/TST/cards?effect=is_nothing', 400),
+            ('/sets/TST/metrics?restriction=draft', 400),
+            ('/nothing/here', 404),
+            ]:
+        with pytest.raises(ServiceError) as error:
+            client.get(path)
+        assert error.value.status == status
+
+def test_stats(all_sets):
+    client = ServiceClient(CatalogService(all_sets))
+    client.get('/sets/TST/metrics')
+    client.get('/sets/TST/metrics')
+    for i in range(5):
+        with pytest.raises(ServiceError):
+            client.get(f'/junk{i}/a/b/c')
+    stats = client.get('/stats')
+    assert stats['latency']['/sets/<code>/metrics']['count'] == 2
+    # Unknown routes share one label
+    assert stats['latency']['<unknown>']['count'] == 5
+    assert set(stats['latency']) == {'/sets/<code>/metrics', '<unknown>'}
+    assert stats['cache'] == {'cards': 1, 'metrics': 1}
+
+def test_http(all_sets):
+    server = serve(CatalogService(all_sets), port=0)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        with urllib.request.urlopen(url + '/sets/TST/cards?rarity=uncommon') as response:
+            assert response.status == 200
+            assert response.headers['Content-Type'] == 'application/json'
+            assert len(json.loads(response.read())) == 2
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + '/sets/XXX/metrics')
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()